@@ -0,0 +1,149 @@
+"""Vertex orbits of the automorphism group, by individualization and colour refinement.
+
+The search follows the first path of an individualization-refinement
+tree: starting from the stable colouring of refinement.py, the first
+vertex of the first colour class with several members is given a colour
+of its own and the colouring refined again, until every vertex has its
+own colour. That leaf colouring numbers the vertices; its certificate is
+the sorted list of edges between colours.
+
+Then, from the deepest level up, every other vertex w of that level's
+class is tried in place of the path's vertex: a depth-first search below
+w looks for a leaf with the first leaf's certificate, which maps the
+first leaf's vertices onto its own as an automorphism fixing the path
+above the level. Branches whose colour-class sizes already differ from
+the first path's at the same depth are cut. Automorphisms found are
+merged into a union-find of orbits, and a w already in the orbit of the
+path's vertex is skipped, as nauty does with its first-path orbits.
+
+Vertices reported in one orbit are always related by an automorphism.
+The search is exhaustive, so the orbits are the exact orbits of the
+automorphism group; on graphs whose colour classes refine poorly, such as
+strongly regular graphs that are not vertex-transitive, it can take time
+exponential in the depth.
+
+    orbits, generators = automorphism_orbits(adjacency)   # orbits e.g. [[0, 2], [1], [3, 4]]
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from refinement import adjacency_to_csr, refine_colours
+
+# One permutation per automorphism: image[vertex].
+Automorphism = List[int]
+
+
+def individualize(colours: np.ndarray, vertex: int) -> np.ndarray:
+    """`colours` with `vertex` alone in a colour placed just before the rest of its class."""
+    colour = colours[vertex]
+    result = colours + (colours >= colour)
+    result[vertex] = colour
+    return result
+
+
+def _target_cell(colours: np.ndarray) -> Optional[np.ndarray]:
+    """Members, in vertex order, of the first colour class with several vertices."""
+    sizes = np.bincount(colours)
+    shared = np.flatnonzero(sizes > 1)
+    if not len(shared):
+        return None
+    return np.flatnonzero(colours == shared[0])
+
+
+def _leaf_certificate(indptr: np.ndarray, indices: np.ndarray, colours: np.ndarray) -> bytes:
+    """Sorted edges between colours of a discrete colouring: equal for isomorphic leaves."""
+    owners = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    edges = colours[owners] * len(colours) + colours[indices]
+    return np.sort(edges).tobytes()
+
+
+class _Search:
+    def __init__(self, adjacency: Sequence[Sequence[int]], fixed: Sequence[int] = ()):
+        self.indptr, self.indices = adjacency_to_csr(adjacency)
+        self.order = len(adjacency)
+        self.fixed: Sequence[int] = fixed
+        self.parent = list(range(self.order))
+        self.generators: List[Automorphism] = []
+
+    def refine(self, colours: np.ndarray) -> np.ndarray:
+        return refine_colours(self.indptr, self.indices, colours)[0]
+
+    def find(self, vertex: int) -> int:
+        while self.parent[vertex] != vertex:
+            self.parent[vertex] = self.parent[self.parent[vertex]]
+            vertex = self.parent[vertex]
+        return vertex
+
+    def add_automorphism(self, first_leaf: np.ndarray, leaf: np.ndarray) -> None:
+        vertex_of_colour = np.empty(self.order, dtype=np.int64)
+        vertex_of_colour[leaf] = np.arange(self.order)
+        image = vertex_of_colour[first_leaf].tolist()
+        self.generators.append(image)
+        for vertex, target in enumerate(image):
+            root, other = self.find(vertex), self.find(target)
+            if root != other:
+                self.parent[max(root, other)] = min(root, other)
+
+    def matching_leaf(self, colours: np.ndarray, vertex: int, depth: int,
+                      path_sizes: List[np.ndarray], certificate: bytes) -> Optional[np.ndarray]:
+        """A leaf below `colours` with `vertex` individualized, at `depth`, that has
+        the first leaf's certificate; depth-first, refining a branch once popped."""
+        stack: List[Tuple[np.ndarray, int, int]] = [(colours, vertex, depth)]
+        while stack:
+            colours, vertex, depth = stack.pop()
+            colours = self.refine(individualize(colours, vertex))
+            if not np.array_equal(np.bincount(colours), path_sizes[depth]):
+                continue
+            cell = _target_cell(colours)
+            if cell is None:
+                if _leaf_certificate(self.indptr, self.indices, colours) == certificate:
+                    return colours
+                continue
+            stack.extend((colours, member, depth + 1) for member in reversed(cell.tolist()))
+        return None
+
+    def run(self) -> None:
+        colours = self.refine(None)
+        for vertex in self.fixed:
+            colours = self.refine(individualize(colours, vertex))
+        path = [colours]
+        cells = []
+        while True:
+            cell = _target_cell(path[-1])
+            if cell is None:
+                break
+            cells.append(cell)
+            path.append(self.refine(individualize(path[-1], int(cell[0]))))
+        first_leaf = path[-1]
+        certificate = _leaf_certificate(self.indptr, self.indices, first_leaf)
+        path_sizes = [np.bincount(colours) for colours in path]
+
+        # Automorphisms found at deeper levels fix the path above this one,
+        # so the union-find holds orbits of that level's stabilizer.
+        for level in reversed(range(len(cells))):
+            chosen = int(cells[level][0])
+            for vertex in cells[level][1:].tolist():
+                if self.find(vertex) == self.find(chosen):
+                    continue
+                leaf = self.matching_leaf(path[level], vertex, level + 1, path_sizes,
+                                          certificate)
+                if leaf is not None:
+                    self.add_automorphism(first_leaf, leaf)
+
+
+def automorphism_orbits(adjacency: Sequence[Sequence[int]], fixed: Sequence[int] = ()
+                        ) -> Tuple[List[List[int]], List[Automorphism]]:
+    """The orbits of the vertices 0..n-1, each sorted and ordered by smallest
+    vertex, and the automorphisms found, which generate the group.
+
+    With `fixed`, the group is the stabilizer of those vertices: they start
+    individualized, so every automorphism found maps each of them to itself.
+    """
+    search = _Search(adjacency, fixed)
+    if search.order:
+        search.run()
+    orbits: Dict[int, List[int]] = {}
+    for vertex in range(search.order):
+        orbits.setdefault(search.find(vertex), []).append(vertex)
+    return list(orbits.values()), search.generators
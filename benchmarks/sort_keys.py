@@ -0,0 +1,60 @@
+"""Times compare-based sorting against key-based sorting on the test_order(6) workload.
+
+Run from the repository root:
+
+    python -m benchmarks.sort_keys [order]
+"""
+import itertools
+import string
+import sys
+import time
+from typing import Dict, List
+
+import networkx as nx
+
+from graph_signature_v2 import GraphSignatures
+
+
+def labelled_graphs(order: int) -> List[nx.Graph]:
+    """All 2**k labelled graphs of the given order, built like chapter 5's test_order."""
+    nodes = list(string.ascii_uppercase[:order])
+    possible_edges = list(itertools.combinations(nodes, 2))
+    graphs = []
+    for num_edges_to_select in range(len(possible_edges) + 1):
+        for edge_combo in itertools.combinations(possible_edges, num_edges_to_select):
+            graph = nx.Graph()
+            graph.add_nodes_from(nodes)
+            graph.add_edges_from(edge_combo)
+            graphs.append(graph)
+    return graphs
+
+
+def run(graphs: List[nx.Graph], sort_keys: bool) -> Dict[str, float]:
+    signatures = []
+    start = time.perf_counter()
+    for graph in graphs:
+        gs = GraphSignatures(graph, sort_keys=sort_keys)
+        gs.compute_all_signatures()
+        signatures.append(gs.sig())
+    return {"seconds": time.perf_counter() - start, "signatures": signatures}
+
+
+def main(order: int = 6) -> None:
+    graphs = labelled_graphs(order)
+    print(f"order {order}: {len(graphs)} labelled graphs")
+
+    compare_run = run(graphs, sort_keys=False)
+    keys_run = run(graphs, sort_keys=True)
+
+    if compare_run["signatures"] != keys_run["signatures"]:
+        raise AssertionError("sort_keys=True produced different signatures")
+
+    unique = len(set(keys_run["signatures"]))
+    speedup = compare_run["seconds"] / keys_run["seconds"]
+    print(f"compare_signatures sorts: {compare_run['seconds']:.2f}s")
+    print(f"signature_sort_key sorts: {keys_run['seconds']:.2f}s")
+    print(f"speedup: {speedup:.2f}x, unique signatures: {unique}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 6)
@@ -0,0 +1,314 @@
+"""Benchmark suite: compute_all_signatures over named graph families.
+
+Each case runs twice, each time in a child process with a time limit: once
+timed, once under tracemalloc with compare calls counted. Results are written as JSON
+so that two commits can be compared:
+
+    python -m benchmarks.suite --output before.json
+    git checkout other-branch
+    python -m benchmarks.suite --output after.json --baseline before.json
+
+Passes, tree entries and compares do not depend on the machine, so any
+change in them is reported; wall time is flagged when it grows by more
+than --tolerance. With --baseline the exit status is 1 on a regression.
+
+Cases: Erdos-Renyi G(n, p) at three densities, random regular graphs,
+cycles and paths, hypercubes, Paley graphs (P(17) is the R(4,4) > 17
+colouring of images/fig4-ramsey_4_4.py), strongly regular graphs and all
+labelled graphs of order 5 and 6. Symmetric graphs are the slow ones: the
+SLOW_CASES (the 4-cube, P(13), P(17), the 16-vertex strongly regular
+graphs and order 6) do not finish, or cannot be profiled, in the default
+time limit. They only run with --slow or when named, and are otherwise
+reported and saved as "skipped"; skipped cases are never compared with a
+baseline.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import graph_signature_v2
+from benchmarks.scaling import adjacency_lists, cycle, path
+from graph_enumeration import gray_code_graphs
+from graph_signature_v2 import (SCHEDULERS, TREE_BACKENDS, GraphSignatures, SharedSignatureTrees,
+                                SignatureTreeArrays)
+from tracing import tree_size
+
+# Metrics that only depend on the code, not on the machine.
+EXACT_METRICS = ("passes", "tree_nodes", "compares")
+
+
+def gnp(order: int, probability: float, seed: int = 0) -> List[List[int]]:
+    """Erdos-Renyi G(n, p)."""
+    rng = random.Random(seed)
+    return adjacency_lists(order, [(u, v) for u in range(order) for v in range(u + 1, order)
+                              if rng.random() < probability])
+
+
+def random_regular(degree: int, order: int, seed: int = 0) -> List[List[int]]:
+    import networkx as nx
+
+    graph = nx.random_regular_graph(degree, order, seed=seed)
+    return adjacency_lists(order, graph.edges())
+
+
+def hypercube(dimension: int) -> List[List[int]]:
+    order = 1 << dimension
+    return adjacency_lists(order, [(v, v ^ (1 << bit)) for v in range(order)
+                              for bit in range(dimension) if v < v ^ (1 << bit)])
+
+
+def paley(prime: int) -> List[List[int]]:
+    """Vertices mod p, joined when their difference is a quadratic residue (p = 1 mod 4)."""
+    residues = {(x * x) % prime for x in range(1, prime)}
+    return adjacency_lists(prime, [(u, v) for u in range(prime) for v in range(u + 1, prime)
+                              if (v - u) % prime in residues])
+
+
+def petersen() -> List[List[int]]:
+    """srg(10, 3, 0, 1)."""
+    outer = [(v, (v + 1) % 5) for v in range(5)]
+    spokes = [(v, v + 5) for v in range(5)]
+    inner = [(5 + v, 5 + (v + 2) % 5) for v in range(5)]
+    return adjacency_lists(10, outer + spokes + inner)
+
+
+def rook(side: int) -> List[List[int]]:
+    """Rook's graph on a side x side board: srg(9, 4, 1, 2) (also Paley(9)) for side 3,
+    srg(16, 6, 2, 2) for side 4."""
+    cells = [(r, c) for r in range(side) for c in range(side)]
+    return adjacency_lists(len(cells), [(i, j) for i, a in enumerate(cells) for j, b in enumerate(cells)
+                                   if i < j and (a[0] == b[0] or a[1] == b[1])])
+
+
+def shrikhande() -> List[List[int]]:
+    """srg(16, 6, 2, 2) again, but not isomorphic to the 4x4 rook's graph."""
+    steps = [(1, 0), (3, 0), (0, 1), (0, 3), (1, 1), (3, 3)]
+    edges = []
+    for a in range(16):
+        for dx, dy in steps:
+            b = ((a // 4 + dx) % 4) * 4 + (a % 4 + dy) % 4
+            if a < b:
+                edges.append((a, b))
+    return adjacency_lists(16, edges)
+
+
+def _single(build: Callable[[], List[List[int]]]) -> Callable[..., Iterator[GraphSignatures]]:
+    def graphs(**options: Any) -> Iterator[GraphSignatures]:
+        yield GraphSignatures.from_adjacency_lists(build(), **options)
+    return graphs
+
+
+def _labelled(order: int) -> Callable[..., Iterator[GraphSignatures]]:
+    def graphs(**options: Any) -> Iterator[GraphSignatures]:
+        for _, rows in gray_code_graphs(order):
+            yield GraphSignatures.from_bitsets(rows, **options)
+    return graphs
+
+
+# name -> (family, graphs(**signature_options))
+CASES: Dict[str, Any] = {
+    "er-sparse-1000": ("erdos-renyi", _single(lambda: gnp(1000, 3 / 999))),
+    "er-medium-200": ("erdos-renyi", _single(lambda: gnp(200, 0.1))),
+    "er-dense-60": ("erdos-renyi", _single(lambda: gnp(60, 0.5))),
+    "regular-3-100": ("random-regular", _single(lambda: random_regular(3, 100))),
+    "regular-4-200": ("random-regular", _single(lambda: random_regular(4, 200))),
+    "cycle-32": ("cycle", _single(lambda: cycle(32))),
+    "path-64": ("path", _single(lambda: path(64))),
+    "hypercube-3": ("hypercube", _single(lambda: hypercube(3))),
+    "hypercube-4": ("hypercube", _single(lambda: hypercube(4))),
+    "paley-13": ("paley", _single(lambda: paley(13))),
+    "paley-17": ("paley", _single(lambda: paley(17))),
+    "petersen": ("strongly-regular", _single(petersen)),
+    "shrikhande": ("strongly-regular", _single(shrikhande)),
+    "rook-3x3": ("strongly-regular", _single(lambda: rook(3))),
+    "rook-4x4": ("strongly-regular", _single(lambda: rook(4))),
+    "order-5": ("enumeration", _labelled(5)),
+    "order-6": ("enumeration", _labelled(6)),
+}
+# Cases that time out in two minutes, or whose tracemalloc run does in ten.
+SLOW_CASES = {"hypercube-4", "paley-13", "paley-17", "shrikhande", "rook-4x4", "order-6"}
+
+
+@contextlib.contextmanager
+def counting_compares(counter: List[int]) -> Iterator[None]:
+    """Counts top-level comparisons of every backend into counter[0]."""
+    compare_signatures = graph_signature_v2.compare_signatures
+    tree_compares = {cls: cls.compare for cls in (SignatureTreeArrays, SharedSignatureTrees)}
+
+    def counted_signatures(sig_a, sig_b):
+        counter[0] += 1
+        return compare_signatures(sig_a, sig_b)
+
+    def counted_tree(tree_compare):
+        def compare(tree, row_a, row_b):
+            counter[0] += 1
+            return tree_compare(tree, row_a, row_b)
+        return compare
+
+    graph_signature_v2.compare_signatures = counted_signatures
+    for cls, tree_compare in tree_compares.items():
+        cls.compare = counted_tree(tree_compare)
+    try:
+        yield
+    finally:
+        graph_signature_v2.compare_signatures = compare_signatures
+        for cls, tree_compare in tree_compares.items():
+            cls.compare = tree_compare
+
+
+def time_case(name: str, options: Dict[str, Any]) -> float:
+    start = time.perf_counter()
+    for gs in CASES[name][1](**options):
+        gs.compute_all_signatures()
+        gs.digest()
+    return time.perf_counter() - start
+
+
+def profile_case(name: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Peak memory, passes, tree entries and compares, summed over the case's graphs."""
+    result = {"graphs": 0, "vertices": 0, "passes": 0, "tree_nodes": 0}
+    compares = [0]
+    tracemalloc.start()
+    with counting_compares(compares):
+        for gs in CASES[name][1](**options):
+            gs.compute_all_signatures()
+            gs.digest()
+            result["graphs"] += 1
+            result["vertices"] += len(gs.all_signatures)
+            result["passes"] += gs.passes
+            result["tree_nodes"] += tree_size(gs)
+    result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    result["compares"] = compares[0]
+    return result
+
+
+def _isolated(function: Callable[..., Any], timeout: float, *args: Any) -> Any:
+    """function(*args) in a child process, or None if it is still running after `timeout`."""
+    pool = multiprocessing.Pool(1)
+    try:
+        return pool.apply_async(function, args).get(timeout)
+    except multiprocessing.TimeoutError:
+        return None
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def run_case(name: str, options: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """Times the case, then profiles it; tracemalloc is slow, so that run gets 5 x timeout."""
+    result: Dict[str, Any] = {"name": name, "family": CASES[name][0]}
+    seconds = _isolated(time_case, timeout, name, options)
+    if seconds is None:
+        result.update(status="timeout", seconds=timeout)
+        return result
+    result.update(status="ok", seconds=seconds)
+    profile = _isolated(profile_case, 5 * timeout, name, options)
+    if profile is None:
+        result["status"] = "profile timeout"
+    else:
+        result.update(profile)
+    return result
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(results: Sequence[Dict[str, Any]], baseline: Dict[str, Any],
+                tolerance: float) -> List[str]:
+    """Differences from a previous run that deserve a look."""
+    previous = {case["name"]: case for case in baseline["cases"]}
+    found = []
+    for case in results:
+        before = previous.get(case["name"])
+        if before is None:
+            continue
+        if "skipped" in (case["status"], before["status"]):
+            continue
+        if case["status"] != before["status"]:
+            found.append(f"{case['name']}: {before['status']} -> {case['status']}")
+            continue
+        if case["status"] == "timeout":
+            continue
+        for metric in EXACT_METRICS:
+            if metric in case and case[metric] != before[metric]:
+                found.append(f"{case['name']}: {metric} {before[metric]} -> {case[metric]}")
+        if case["seconds"] > before["seconds"] * (1 + tolerance):
+            found.append(f"{case['name']}: {before['seconds']:.2f}s -> {case['seconds']:.2f}s")
+    return found
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cases", nargs="*", metavar="case",
+                        help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative growth of wall time")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds per case")
+    parser.add_argument("--slow", action="store_true",
+                        help=f"also run the slow cases ({', '.join(sorted(SLOW_CASES))})")
+    parser.add_argument("--tree-backend", choices=TREE_BACKENDS, default="objects")
+    parser.add_argument("--scheduler", choices=SCHEDULERS, default="full")
+    parser.add_argument("--sort-keys", action="store_true")
+    parser.add_argument("--refine", action="store_true")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s) {', '.join(unknown)}")
+    options = dict(tree_backend=args.tree_backend, scheduler=args.scheduler,
+                   sort_keys=args.sort_keys, refine=args.refine)
+
+    print(f"{'case':16} {'graphs':>6} {'seconds':>8} {'peak MB':>8} {'passes':>7} "
+          f"{'tree nodes':>11} {'compares':>10}")
+    results = []
+    for name in args.cases or CASES:
+        if name in SLOW_CASES and not (args.slow or args.cases):
+            results.append({"name": name, "family": CASES[name][0], "status": "skipped"})
+            print(f"{name:16} {'':>6} {'':>8} skipped (--slow)", flush=True)
+            continue
+        case = run_case(name, options, args.timeout)
+        results.append(case)
+        if case["status"] == "ok":
+            print(f"{name:16} {case['graphs']:>6} {case['seconds']:>8.2f} "
+                  f"{case['peak_mb']:>8.1f} {case['passes']:>7} {case['tree_nodes']:>11} "
+                  f"{case['compares']:>10}", flush=True)
+        elif case["status"] == "timeout":
+            print(f"{name:16} {'':>6} {'> ' + str(int(args.timeout)):>8} timeout", flush=True)
+        else:
+            print(f"{name:16} {'':>6} {case['seconds']:>8.2f} {case['status']}", flush=True)
+
+    report = {"commit": _commit(), "python": platform.python_version(),
+              "options": options, "timeout": args.timeout, "cases": results}
+    with open(args.output, "w", encoding="utf-8") as out:
+        json.dump(report, out, indent=2)
+        out.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as source:
+            baseline = json.load(source)
+        if baseline["options"] != options:
+            print(f"note: the baseline ran with {baseline['options']}")
+        found = regressions(results, baseline, args.tolerance)
+        for line in found:
+            print(f"regression? {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+"""A persistent catalogue of isomorphism classes, keyed by canonical form.
+
+Each entry holds a digest of the class's canonical graph6
+(GraphSignatures.canonical_graph6, see canonical_digest), how many graphs
+were seen in the class, the canonical graph6 itself, and up to
+`max_examples` labelled graph6 examples. Signature digests are not used as
+keys: with the default options isomorphic graphs can have different
+signatures, and one class would get several entries. Validation runs
+(`--catalogue`) and classifications (classification_entries) append their
+classes to one file, so that later runs can ask "have we seen this class
+before?".
+
+The file is written once and read through mmap:
+
+    header     magic, digest size, bucket bits, entries, section offsets
+    metadata   JSON: signature options and max_examples
+    heap       per entry: canonical g6 and examples, separated by newlines
+    records    per entry, sorted by digest: digest, count, heap offset and length
+    index      2**bucket_bits + 1 record numbers: where each bucket starts
+
+Digests are uniform hashes, so the bucket of a digest is its top
+bucket_bits bits and holds a handful of records; a lookup reads one index
+slot pair and bisects that bucket, without touching the rest of the file.
+Appending or merging writes a new file by a streaming merge of sorted
+entries and swaps it in with os.replace; readers of the old file keep
+their mapping.
+
+    python -m catalogue info graphs.cat
+    python -m catalogue query graphs.cat "DQc" "D?{"
+    python -m catalogue merge all.cat n8.cat n9.cat
+"""
+import argparse
+import heapq
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from itertools import groupby
+from hashlib import blake2b
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from graph_signature_v2 import DIGEST_SIZE, GraphSignatures
+
+# Version 1 was keyed by signature digest.
+CATALOGUE_MAGIC = b"RSIGCAT2"
+# magic, digest size, bucket bits, entries, metadata, heap, records and index offsets
+_HEADER = struct.Struct("<8sIIQQQQQ")
+# count, heap offset and heap length, after the digest
+_RECORD_TAIL = struct.Struct("<QQI")
+_INDEX_SLOT = struct.Struct("<Q")
+# Average records per bucket the index is sized for.
+RECORDS_PER_BUCKET = 4
+MAX_EXAMPLES = 4
+
+# (canonical_digest of the canonical g6, count, canonical g6, example g6s)
+CatalogueEntry = Tuple[bytes, int, str, List[str]]
+
+
+def canonical_digest(canonical: bytes, digest_size: int = DIGEST_SIZE) -> bytes:
+    """The key of a class: a BLAKE2b hash of its canonical graph6."""
+    return blake2b(canonical, digest_size=digest_size).digest()
+
+
+def _bucket_bits(entries: int) -> int:
+    return max(0, (entries // RECORDS_PER_BUCKET).bit_length())
+
+
+def _bucket(digest: bytes, bits: int) -> int:
+    return int.from_bytes(digest[:8], "big") >> (64 - bits) if bits else 0
+
+
+class SignatureCatalogue:
+    """Read-only, memory-mapped view of a catalogue file.
+
+    `digest in catalogue` and get() read only the index slots and records
+    of the digest's bucket; iterating yields every entry in digest order.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            self._map.close()
+            raise ValueError(f"{path} is too short to be a signature catalogue.")
+        (magic, self.digest_size, self.bucket_bits, self.entries, metadata_offset,
+         self._heap_offset, self._records_offset, self._index_offset) = _HEADER.unpack_from(
+            self._map, 0)
+        if magic != CATALOGUE_MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a signature catalogue.")
+        self._record_size = self.digest_size + _RECORD_TAIL.size
+        self.metadata: Dict[str, Any] = json.loads(
+            self._map[metadata_offset:self._heap_offset].decode("utf-8"))
+
+    @property
+    def signature_options(self) -> Dict[str, Any]:
+        return self.metadata["signature_options"]
+
+    @property
+    def max_examples(self) -> int:
+        return self.metadata["max_examples"]
+
+    def __len__(self) -> int:
+        return self.entries
+
+    def _digest_at(self, position: int) -> bytes:
+        offset = self._records_offset + position * self._record_size
+        return self._map[offset:offset + self.digest_size]
+
+    def _find(self, digest: bytes) -> int:
+        """The record number of `digest`, or -1."""
+        if len(digest) != self.digest_size or not self.entries:
+            return -1
+        slot = self._index_offset + _bucket(digest, self.bucket_bits) * _INDEX_SLOT.size
+        low, high = struct.unpack_from("<QQ", self._map, slot)
+        while low < high:
+            middle = (low + high) // 2
+            if self._digest_at(middle) < digest:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.entries and self._digest_at(low) == digest:
+            return low
+        return -1
+
+    def _entry(self, position: int) -> CatalogueEntry:
+        offset = self._records_offset + position * self._record_size
+        digest = self._map[offset:offset + self.digest_size]
+        count, heap_offset, length = _RECORD_TAIL.unpack_from(
+            self._map, offset + self.digest_size)
+        start = self._heap_offset + heap_offset
+        canonical, *examples = self._map[start:start + length].decode("ascii").split("\n")
+        return digest, count, canonical, examples
+
+    def __contains__(self, digest: bytes) -> bool:
+        return self._find(digest) >= 0
+
+    def get(self, digest: bytes) -> Optional[CatalogueEntry]:
+        position = self._find(digest)
+        return None if position < 0 else self._entry(position)
+
+    def lookup(self, graph: Any) -> Tuple[bytes, Optional[CatalogueEntry]]:
+        """(canonical graph6, entry or None) of a graph in any form classification
+        accepts, computed with the catalogue's signature options."""
+        from classification import canonical_invariant, to_adjacency
+
+        canonical = canonical_invariant(to_adjacency(graph), **self.signature_options)
+        entry = self.get(canonical_digest(canonical, self.digest_size))
+        if entry is not None and entry[2] != canonical.decode("ascii"):
+            raise ValueError(f"Digest collision between {canonical!r} and {entry[2]!r}.")
+        return canonical, entry
+
+    def __iter__(self) -> Iterator[CatalogueEntry]:
+        for position in range(self.entries):
+            yield self._entry(position)
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "SignatureCatalogue":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _merge_entries(entry: CatalogueEntry, other: CatalogueEntry,
+                   max_examples: int) -> CatalogueEntry:
+    """Adds counts and keeps the first canonical form and the first distinct examples."""
+    examples = list(entry[3])
+    for example in other[3]:
+        if len(examples) >= max_examples:
+            break
+        if example not in examples:
+            examples.append(example)
+    return entry[0], entry[1] + other[1], entry[2], examples
+
+
+def write_catalogue(path: str, entries: Iterable[CatalogueEntry],
+                    signature_options: Optional[Dict[str, Any]] = None,
+                    max_examples: int = MAX_EXAMPLES,
+                    digest_size: int = DIGEST_SIZE) -> int:
+    """Writes entries sorted by digest to a new catalogue at `path`; returns their number.
+
+    Repeated digests, which must be adjacent, are merged. Records go to a
+    temporary file while the heap is written, so memory does not grow with
+    the number of entries. The file only replaces `path` once complete.
+    """
+    metadata = json.dumps({"signature_options": signature_options or {},
+                           "max_examples": max_examples}, sort_keys=True).encode("utf-8")
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "w+b") as out, tempfile.TemporaryFile(dir=directory) as records:
+            out.write(b"\0" * _HEADER.size)
+            metadata_offset = out.tell()
+            out.write(metadata)
+            heap_offset = out.tell()
+            heap_size = 0
+            count = 0
+            previous = b""
+            for digest, group in groupby(entries, key=lambda entry: entry[0]):
+                if len(digest) != digest_size:
+                    raise ValueError(
+                        f"Digest {digest.hex()} has {len(digest)} bytes, expected {digest_size}.")
+                if digest <= previous:
+                    raise ValueError("Catalogue entries must be sorted by digest.")
+                previous = digest
+                entry = next(group)
+                entry = entry[0], entry[1], entry[2], list(entry[3][:max_examples])
+                for other in group:
+                    entry = _merge_entries(entry, other, max_examples)
+                data = "\n".join([entry[2]] + entry[3]).encode("ascii")
+                out.write(data)
+                records.write(digest + _RECORD_TAIL.pack(entry[1], heap_size, len(data)))
+                heap_size += len(data)
+                count += 1
+
+            records_offset = out.tell()
+            records.seek(0)
+            shutil.copyfileobj(records, out)
+            index_offset = out.tell()
+            bits = _bucket_bits(count)
+            # Bucket b starts at the first record whose top bits are >= b.
+            bucket_starts = [0] * ((1 << bits) + 1)
+            records.seek(0)
+            record_size = digest_size + _RECORD_TAIL.size
+            for position in range(count):
+                bucket_starts[_bucket(records.read(record_size), bits) + 1] += 1
+            for bucket in range(1 << bits):
+                bucket_starts[bucket + 1] += bucket_starts[bucket]
+            out.write(struct.pack(f"<{len(bucket_starts)}Q", *bucket_starts))
+
+            out.seek(0)
+            out.write(_HEADER.pack(CATALOGUE_MAGIC, digest_size, bits, count, metadata_offset,
+                                   heap_offset, records_offset, index_offset))
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return count
+
+
+def merge_catalogues(path: str, sources: Sequence[str],
+                     extra: Iterable[CatalogueEntry] = (),
+                     signature_options: Optional[Dict[str, Any]] = None) -> int:
+    """Writes the union of the `sources` catalogues and the sorted `extra` entries to `path`.
+
+    `path` may be one of the sources. All sources must have been written
+    with the same signature options (`signature_options` when given), or
+    their canonical forms would not be comparable: ValueError otherwise. The
+    largest max_examples wins.
+    """
+    catalogues = [SignatureCatalogue(source) for source in sources]
+    try:
+        settings = {json.dumps(catalogue.signature_options, sort_keys=True)
+                    for catalogue in catalogues}
+        if signature_options is not None:
+            settings.add(json.dumps(signature_options, sort_keys=True))
+        if len(settings) > 1:
+            raise ValueError(f"Cannot merge catalogues of different signature options: "
+                             f"{sorted(settings)}.")
+        if signature_options is None:
+            signature_options = catalogues[0].signature_options if catalogues else {}
+        max_examples = max([MAX_EXAMPLES] + [catalogue.max_examples for catalogue in catalogues])
+        merged = heapq.merge(*catalogues, extra, key=lambda entry: entry[0])
+        return write_catalogue(path, merged, signature_options, max_examples)
+    finally:
+        for catalogue in catalogues:
+            catalogue.close()
+
+
+def append_to_catalogue(path: str, entries: Iterable[CatalogueEntry],
+                        signature_options: Optional[Dict[str, Any]] = None) -> int:
+    """Bulk append: merges `entries`, in any order, into the catalogue at `path`.
+
+    The catalogue is created if missing. Returns the number of entries after
+    the append.
+    """
+    extra = sorted(entries, key=lambda entry: entry[0])
+    sources = [path] if os.path.exists(path) else []
+    return merge_catalogues(path, sources, extra, signature_options or {})
+
+
+def class_entry(count: int, graphs: Sequence[Any],
+                signature_options: Optional[Dict[str, Any]] = None,
+                max_examples: int = MAX_EXAMPLES,
+                canonical: Optional[bytes] = None) -> CatalogueEntry:
+    """The entry of one class: `graphs` are examples in any form classification
+    accepts, the first of which gives the canonical form unless `canonical`
+    is given."""
+    from classification import to_adjacency
+    from graph6 import adjacency_to_graph6
+
+    adjacencies = [to_adjacency(graph) for graph in graphs[:max_examples]]
+    if canonical is None:
+        canonical = GraphSignatures.from_adjacency_lists(
+            adjacencies[0], **(signature_options or {})).canonical_graph6()
+    examples = list(dict.fromkeys(
+        adjacency_to_graph6(adjacency).decode("ascii") for adjacency in adjacencies))
+    return canonical_digest(canonical), count, canonical.decode("ascii"), examples
+
+
+def classification_entries(classes: Dict[Any, List[Any]],
+                           signature_options: Optional[Dict[str, Any]] = None,
+                           max_examples: int = MAX_EXAMPLES) -> List[CatalogueEntry]:
+    """Entries for the classes of classification.classify(). With canonical_keys=True
+    the class ids are the canonical forms and are not computed again."""
+    return [class_entry(len(graphs), graphs, signature_options, max_examples,
+                        key if isinstance(key, bytes) else None)
+            for key, graphs in classes.items()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect, query and merge signature catalogues.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    info = commands.add_parser("info", help="print the size and settings of a catalogue")
+    info.add_argument("path")
+    query = commands.add_parser("query", help="look graph6/sparse6 graphs up in a catalogue")
+    query.add_argument("path")
+    query.add_argument("graphs", nargs="+")
+    merge = commands.add_parser("merge", help="merge catalogues into a new one")
+    merge.add_argument("output")
+    merge.add_argument("sources", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "merge":
+        count = merge_catalogues(args.output, args.sources)
+        print(f"{args.output}: {count} classes")
+        return 0
+    with SignatureCatalogue(args.path) as catalogue:
+        if args.command == "info":
+            graphs = sum(entry[1] for entry in catalogue)
+            print(f"{args.path}: {len(catalogue)} classes, {graphs} graphs, "
+                  f"signature options {catalogue.signature_options}")
+            return 0
+        found = True
+        for graph in args.graphs:
+            canonical, entry = catalogue.lookup(graph)
+            if entry is None:
+                found = False
+                print(f"{graph}: new ({canonical.decode('ascii')})")
+            else:
+                print(f"{graph}: seen {entry[1]} time(s) as {entry[2]}")
+        return 0 if found else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""Grouping many graphs into isomorphism classes, cheapest invariants first.
+
+Graphs are bucketed by a chain of invariants that cost more at each stage:
+order and edge count, the sorted degree sequence, triangle counts, then the
+colour refinement certificate. A bucket that is down to one graph is a class
+and gets no further work, so canonical forms (GraphSignatures.canonical_graph6)
+are only computed for graphs that every cheaper invariant left together.
+Every stage is an isomorphism invariant, so bucketing never separates
+isomorphic graphs, and the last one is complete, so the classes are exact.
+Signature digests are not used as a stage: with the default options two
+isomorphic graphs can have different signatures (see validation.py).
+
+    classes = classify(graph6_lines)
+    classes = classify(graphs, canonical_keys=True)  # ids are canonical graph6
+
+Graphs may be graph6/sparse6 text or bytes, adjacency lists, or networkx
+graphs; each class lists the graphs as they were given.
+"""
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from graph6 import decode_adjacency
+from graph_signature_v2 import GraphSignatures
+
+Adjacency = List[List[int]]
+
+
+def to_adjacency(graph: Any) -> Adjacency:
+    """Adjacency lists over 0..n-1 for any of the accepted graph forms."""
+    if isinstance(graph, (str, bytes)):
+        return decode_adjacency(graph)
+    if hasattr(graph, "adj") and hasattr(graph, "nodes"):
+        index = {node: i for i, node in enumerate(graph.nodes())}
+        return [sorted(index[neighbour] for neighbour in graph.adj[node]) for node in graph.nodes()]
+    return [sorted(neighbours) for neighbours in graph]
+
+
+def size_invariant(adjacency: Adjacency) -> Hashable:
+    return len(adjacency), sum(len(neighbours) for neighbours in adjacency) // 2
+
+
+def degree_invariant(adjacency: Adjacency) -> Hashable:
+    return tuple(sorted(len(neighbours) for neighbours in adjacency))
+
+
+def triangle_invariant(adjacency: Adjacency) -> Hashable:
+    """Sorted (degree, triangles through the vertex) pairs, counted on bitsets."""
+    rows = [sum(1 << neighbour for neighbour in neighbours) for neighbours in adjacency]
+    return tuple(sorted(
+        (len(neighbours),
+         sum(bin(rows[v] & rows[u]).count("1") for u in neighbours) // 2)
+        for v, neighbours in enumerate(adjacency)))
+
+
+def refinement_invariant(adjacency: Adjacency) -> Hashable:
+    from refinement import adjacency_to_csr, certificate, refine_colours
+
+    indptr, indices = adjacency_to_csr(adjacency)
+    colours, _ = refine_colours(indptr, indices)
+    return certificate(indptr, indices, colours)
+
+
+def signature_invariant(adjacency: Adjacency, **signature_options: Any) -> bytes:
+    gs = GraphSignatures.from_adjacency_lists(adjacency, **signature_options)
+    gs.compute_all_signatures()
+    return gs.digest()
+
+
+def canonical_invariant(adjacency: Adjacency, **signature_options: Any) -> bytes:
+    return GraphSignatures.from_adjacency_lists(adjacency, **signature_options).canonical_graph6()
+
+
+# (name, invariant) in increasing cost; classify_graphs adds the canonical form last.
+INVARIANTS: List[Tuple[str, Callable[[Adjacency], Hashable]]] = [
+    ("size", size_invariant),
+    ("degrees", degree_invariant),
+    ("triangles", triangle_invariant),
+    ("refinement", refinement_invariant),
+]
+
+
+class Classification:
+    """Classes found by classify_graphs and how much work each stage did."""
+
+    def __init__(self, classes: Dict[Hashable, List[Any]], evaluations: Dict[str, int],
+                 seconds: float):
+        self.classes: Dict[Hashable, List[Any]] = classes
+        # Stage name -> graphs it was computed for; "canonical" is the last stage.
+        self.evaluations: Dict[str, int] = evaluations
+        self.seconds: float = seconds
+
+    @property
+    def canonical_forms_computed(self) -> int:
+        return self.evaluations.get("canonical", 0)
+
+    def __str__(self) -> str:
+        stages = ", ".join(f"{name} {count}" for name, count in self.evaluations.items())
+        return f"{len(self.classes)} classes in {self.seconds:.2f}s (evaluated: {stages})"
+
+
+def classify_graphs(graphs: Sequence[Any], canonical_keys: bool = False,
+                    invariants: Optional[List[Tuple[str, Callable[[Adjacency], Hashable]]]] = None,
+                    **signature_options: Any) -> Classification:
+    """Isomorphism classes of `graphs`, keyed by consecutive ints.
+
+    With `canonical_keys` every class gets its canonical graph6, including
+    the ones alone in a bucket, and these are the class ids.
+    `signature_options` go to GraphSignatures.
+    """
+    started = time.perf_counter()
+    stages = list(INVARIANTS if invariants is None else invariants)
+    stages.append(("canonical",
+                   lambda adjacency: canonical_invariant(adjacency, **signature_options)))
+    adjacencies = [to_adjacency(graph) for graph in graphs]
+    evaluations = {name: 0 for name, _ in stages}
+
+    # Buckets of graph indices, split by one more invariant per stage.
+    buckets: List[List[int]] = [list(range(len(graphs)))] if graphs else []
+    done: List[List[int]] = []
+    keys: Dict[int, Hashable] = {}
+    for position, (name, invariant) in enumerate(stages):
+        last = position == len(stages) - 1
+        split: List[List[int]] = []
+        for bucket in buckets:
+            if len(bucket) == 1:
+                done.append(bucket)
+                continue
+            by_value: Dict[Hashable, List[int]] = {}
+            for i in bucket:
+                value = invariant(adjacencies[i])
+                evaluations[name] += 1
+                by_value.setdefault(value, []).append(i)
+                if last:
+                    keys[i] = value
+            split.extend(by_value.values())
+        buckets = split
+    done.extend(buckets)
+    if canonical_keys:
+        name, invariant = stages[-1]
+        for members in done:
+            if members[0] not in keys:
+                keys[members[0]] = invariant(adjacencies[members[0]])
+                evaluations[name] += 1
+
+    done.sort(key=lambda members: members[0])
+    classes: Dict[Hashable, List[Any]] = {}
+    for class_id, members in enumerate(done):
+        key = keys[members[0]] if canonical_keys else class_id
+        classes[key] = [graphs[i] for i in members]
+    return Classification(classes, evaluations, time.perf_counter() - started)
+
+
+def classify(graphs: Sequence[Any], canonical_keys: bool = False,
+             **signature_options: Any) -> Dict[Hashable, List[Any]]:
+    """{class_id: [graphs]}; see classify_graphs."""
+    return classify_graphs(graphs, canonical_keys, **signature_options).classes
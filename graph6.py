@@ -0,0 +1,162 @@
+"""Reading and writing the graph6 format (and reading sparse6) without networkx.
+
+The format is described in https://users.cecs.anu.edu.au/~bdm/data/formats.txt.
+Graphs are exchanged as adjacency lists (neighbour indices in ascending order,
+which is also the order networkx.from_graph6_bytes produces) or as one
+bitset per vertex.
+"""
+from typing import Iterable, List, Sequence, Tuple, Union
+
+GRAPH6_HEADER = b">>graph6<<"
+SPARSE6_HEADER = b">>sparse6<<"
+
+
+def _decode_size(data: bytes) -> Tuple[int, int]:
+    """Returns (order, bytes consumed) for the N(n) prefix of graph6 data."""
+    if not data:
+        raise ValueError("Empty graph6 data.")
+    if data[0] != 126:
+        return data[0] - 63, 1
+    if len(data) > 1 and data[1] != 126:
+        size_bytes = data[1:4]
+        consumed = 4
+    else:
+        size_bytes = data[2:8]
+        consumed = 8
+    value = 0
+    for byte in size_bytes:
+        value = (value << 6) | (byte - 63)
+    return value, consumed
+
+
+def _encode_size(order: int) -> bytes:
+    if order < 63:
+        return bytes([order + 63])
+    if order < 258048:
+        return bytes([126] + [((order >> shift) & 63) + 63 for shift in (12, 6, 0)])
+    return bytes([126, 126] + [((order >> shift) & 63) + 63 for shift in range(30, -1, -6)])
+
+
+def _strip(data: Union[bytes, str]) -> bytes:
+    if isinstance(data, str):
+        data = data.encode("ascii")
+    data = data.strip()
+    for header in (GRAPH6_HEADER, SPARSE6_HEADER):
+        if data.startswith(header):
+            data = data[len(header):]
+    return data
+
+
+def graph6_to_adjacency(data: Union[bytes, str]) -> List[List[int]]:
+    """Decodes one graph6 string into adjacency lists."""
+    data = _strip(data)
+    order, offset = _decode_size(data)
+    bit_count = order * (order - 1) // 2
+    if len(data) - offset < (bit_count + 5) // 6:
+        raise ValueError(f"graph6 data too short for a graph of order {order}.")
+
+    adjacency: List[List[int]] = [[] for _ in range(order)]
+    # Bits run through the upper triangle column by column: (0,1), (0,2), (1,2), ...
+    i, j = 0, 1
+    for byte in data[offset:offset + (bit_count + 5) // 6]:
+        value = byte - 63
+        for shift in (5, 4, 3, 2, 1, 0):
+            if j >= order:
+                break
+            if (value >> shift) & 1:
+                adjacency[i].append(j)
+                adjacency[j].append(i)
+            i += 1
+            if i == j:
+                i = 0
+                j += 1
+    return adjacency
+
+
+def sparse6_to_adjacency(data: Union[bytes, str]) -> List[List[int]]:
+    """Decodes one sparse6 string into adjacency lists.
+
+    Loops and repeated edges are dropped and neighbours are sorted, so the
+    result is the same simple graph graph6_to_adjacency would give.
+    """
+    data = _strip(data)
+    if not data.startswith(b":"):
+        raise ValueError("sparse6 data must start with ':'.")
+    order, offset = _decode_size(data[1:])
+    bits = [((byte - 63) >> shift) & 1
+            for byte in data[1 + offset:] for shift in (5, 4, 3, 2, 1, 0)]
+    k = 1
+    while (1 << k) < order:
+        k += 1
+
+    neighbour_sets: List[set] = [set() for _ in range(order)]
+    v = 0
+    # Each item is one bit b (move to the next vertex) and k bits for x.
+    for start in range(0, len(bits) - k, k + 1):
+        x = 0
+        for bit in bits[start + 1:start + 1 + k]:
+            x = (x << 1) | bit
+        if bits[start]:
+            v += 1
+        if x >= order or v >= order:
+            break
+        if x > v:
+            v = x
+        elif x != v:
+            neighbour_sets[x].add(v)
+            neighbour_sets[v].add(x)
+    return [sorted(neighbours) for neighbours in neighbour_sets]
+
+
+def decode_adjacency(data: Union[bytes, str]) -> List[List[int]]:
+    """Decodes a graph6 or sparse6 string (told apart by sparse6's leading ':')."""
+    data = _strip(data)
+    if data.startswith(b":"):
+        return sparse6_to_adjacency(data)
+    if data.startswith(b"&"):
+        raise ValueError("digraph6 is not supported, signatures are for undirected graphs.")
+    return graph6_to_adjacency(data)
+
+
+def bitsets_to_graph6(rows: Sequence[int]) -> bytes:
+    """Encodes a graph given as one neighbour bitset per vertex (no header, no newline)."""
+    order = len(rows)
+    out = bytearray(_encode_size(order))
+    value = 0
+    filled = 0
+    for j in range(1, order):
+        row = rows[j]
+        for i in range(j):
+            value = (value << 1) | ((row >> i) & 1)
+            filled += 1
+            if filled == 6:
+                out.append(value + 63)
+                value = 0
+                filled = 0
+    if filled:
+        out.append((value << (6 - filled)) + 63)
+    return bytes(out)
+
+
+def bitsets_to_adjacency(rows: Sequence[int]) -> List[List[int]]:
+    """Turns one neighbour bitset per vertex into ascending adjacency lists."""
+    adjacency = []
+    for row in rows:
+        neighbours = []
+        while row:
+            low = row & -row
+            neighbours.append(low.bit_length() - 1)
+            row ^= low
+        adjacency.append(neighbours)
+    return adjacency
+
+
+def adjacency_to_graph6(adjacency: Sequence[Iterable[int]]) -> bytes:
+    """Encodes a graph given as adjacency lists (no header, no newline)."""
+    rows = []
+    for neighbours in adjacency:
+        row = 0
+        for neighbour in neighbours:
+            row |= 1 << neighbour
+        rows.append(row)
+    return bitsets_to_graph6(rows)
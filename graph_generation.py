@@ -0,0 +1,217 @@
+"""Generation of one graph per isomorphism class by canonical augmentation.
+
+Graphs of order n are grown from the representatives of order n - 1 by adding
+a vertex n - 1 joined to a subset S of the old vertices (McKay's canonical
+construction path). Subsets that an automorphism of the parent maps onto
+each other give isomorphic children, so only one S per orbit of the parent's
+automorphism group is tried; the group comes with the parent, found once
+when the parent was kept (see automorphisms.py).
+
+A child is kept only when its new vertex is in the orbit of its canonical
+vertex, i.e. when removing the canonical vertex gives back this parent. The
+canonical vertex is chosen among the vertices with the smallest invariant
+(degree, sorted neighbour degrees); most children are rejected by that
+invariant alone, or accepted when the new vertex and all vertices sharing
+its invariant form one orbit. Only the remaining ties are broken by the
+largest label of GraphSignatures.canonical_labeling(). The children kept are
+then pairwise non-isomorphic and need no de-duplication.
+
+Signature digests are not a labelling-invariant certificate, so they are only
+computed on request: validate_orderly compares the number of distinct digests
+of each level with OEIS A000088, as a check of the signature algorithm.
+"""
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from automorphisms import Automorphism, automorphism_orbits
+from graph6 import bitsets_to_adjacency
+from graph_signature_v2 import GraphSignatures
+
+# (neighbour bitsets, generators of the automorphism group, signature digest or None)
+Representative = Tuple[List[int], List[Automorphism], Optional[bytes]]
+
+
+def _image(mask: int, automorphism: Automorphism) -> int:
+    image = 0
+    while mask:
+        low = mask & -mask
+        image |= 1 << automorphism[low.bit_length() - 1]
+        mask ^= low
+    return image
+
+
+def augmentations(rows: List[int], generators: Sequence[Automorphism] = ()
+                  ) -> Iterator[List[int]]:
+    """Children of `rows` in which the new vertex has minimum degree, one per
+    orbit of neighbour sets under the group generated by `generators`.
+
+    Only those can pass the canonical parent check, since the canonical vertex
+    has minimum degree.
+    """
+    order = len(rows)
+    degrees = [bin(row).count("1") for row in rows]
+    seen: Set[int] = set()
+    for size in range(order + 1):
+        for subset in itertools.combinations(range(order), size):
+            new_row = 0
+            for vertex in subset:
+                new_row |= 1 << vertex
+            if new_row in seen:
+                continue
+            # The old vertices have degree + 1 inside S and keep it outside.
+            if any(size > degrees[v] + ((new_row >> v) & 1) for v in range(order)):
+                continue
+            orbit = [new_row]
+            seen.add(new_row)
+            for mask in orbit:
+                for automorphism in generators:
+                    image = _image(mask, automorphism)
+                    if image not in seen:
+                        seen.add(image)
+                        orbit.append(image)
+            bit = 1 << order
+            yield [row | bit if (new_row >> v) & 1 else row
+                   for v, row in enumerate(rows)] + [new_row]
+
+
+def vertex_invariants(rows: Sequence[int]) -> List[Tuple[int, Tuple[int, ...]]]:
+    """(degree, sorted neighbour degrees) of each vertex."""
+    degrees = [bin(row).count("1") for row in rows]
+    return [(degrees[vertex], tuple(sorted(degrees[neighbour] for neighbour in range(len(rows))
+                                           if row >> neighbour & 1)))
+            for vertex, row in enumerate(rows)]
+
+
+def canonical_child(rows: List[int], new_vertex: int,
+                    signature_options: Optional[Dict[str, Any]] = None
+                    ) -> Optional[List[Automorphism]]:
+    """The automorphism generators of `rows` if `new_vertex` is in the orbit of its
+    canonical vertex, else None."""
+    invariants = vertex_invariants(rows)
+    smallest = min(invariants)
+    if invariants[new_vertex] != smallest:
+        return None
+    candidates = [vertex for vertex, invariant in enumerate(invariants) if invariant == smallest]
+    orbits, generators = automorphism_orbits(bitsets_to_adjacency(rows))
+    orbit = next(orbit for orbit in orbits if new_vertex in orbit)
+    if all(vertex in orbit for vertex in candidates):
+        return generators
+    labeling = GraphSignatures.from_bitsets(
+        rows, **(signature_options or {})).canonical_labeling()
+    canonical_vertex = max(candidates, key=labeling.__getitem__)
+    return generators if canonical_vertex in orbit else None
+
+
+def canonical_children(rows: List[int], generators: Sequence[Automorphism] = (),
+                       signature_options: Optional[Dict[str, Any]] = None,
+                       signatures: bool = False) -> List[Representative]:
+    """The children of one parent that pass the canonical parent check.
+
+    `generators` generate the parent's automorphism group. With `signatures`,
+    each child also gets its signature digest.
+    """
+    signature_options = signature_options or {}
+    kept: List[Representative] = []
+    for child in augmentations(rows, generators):
+        child_generators = canonical_child(child, len(rows), signature_options)
+        if child_generators is None:
+            continue
+        digest = None
+        if signatures:
+            gs = GraphSignatures.from_bitsets(child, **signature_options)
+            gs.compute_all_signatures()
+            digest = gs.digest()
+        kept.append((child, child_generators, digest))
+    return kept
+
+
+def _canonical_children_batch(parents: List[Tuple[List[int], List[Automorphism]]],
+                              signature_options: Dict[str, Any], signatures: bool
+                              ) -> List[List[Representative]]:
+    return [canonical_children(rows, generators, signature_options, signatures)
+            for rows, generators in parents]
+
+
+class GenerationLevel:
+    """The representatives generated for one order, with their automorphism generators
+    and, when requested, signature digests."""
+
+    def __init__(self, order: int, graphs: List[List[int]],
+                 generators: List[List[Automorphism]], digests: List[bytes],
+                 seconds: float):
+        self.order: int = order
+        self.graphs: List[List[int]] = graphs
+        self.generators: List[List[Automorphism]] = generators
+        self.digests: List[bytes] = digests
+        self.seconds: float = seconds
+
+    @property
+    def count(self) -> int:
+        return len(self.graphs)
+
+    @property
+    def distinct_signatures(self) -> int:
+        """Fewer than count means non-isomorphic graphs share a signature."""
+        return len(set(self.digests))
+
+
+def next_level(parents: GenerationLevel, workers: Optional[int] = None,
+               batch_size: int = 64, signatures: bool = False,
+               **signature_options: Any) -> GenerationLevel:
+    """Representatives of order parents.order + 1, one batch of parents per task."""
+    pairs = list(zip(parents.graphs, parents.generators))
+    workers = workers or os.cpu_count() or 1
+    batches = [pairs[i:i + batch_size] for i in range(0, len(pairs), batch_size)]
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_canonical_children_batch(batch, signature_options, signatures)
+                   for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_canonical_children_batch, batches,
+                                    itertools.repeat(signature_options),
+                                    itertools.repeat(signatures)))
+    graphs: List[List[int]] = []
+    generators: List[List[Automorphism]] = []
+    digests: List[bytes] = []
+    for batch in results:
+        for children in batch:
+            for child, child_generators, digest in children:
+                graphs.append(child)
+                generators.append(child_generators)
+                if digest is not None:
+                    digests.append(digest)
+    return GenerationLevel(parents.order + 1, graphs, generators, digests,
+                           time.perf_counter() - started)
+
+
+def generate_levels(max_order: int, workers: Optional[int] = None, signatures: bool = False,
+                    **signature_options: Any) -> Iterator[GenerationLevel]:
+    """Yields the levels of order 1 .. max_order, starting from the single vertex.
+
+    With `signatures`, each level also has the signature digests of its graphs.
+    """
+    digests = []
+    if signatures:
+        gs = GraphSignatures.from_bitsets([0], **signature_options)
+        gs.compute_all_signatures()
+        digests.append(gs.digest())
+    level = GenerationLevel(1, [[0]], [[]], digests, 0.0)
+    yield level
+    for _ in range(2, max_order + 1):
+        level = next_level(level, workers, signatures=signatures, **signature_options)
+        yield level
+
+
+def generate_graphs(order: int, workers: Optional[int] = None,
+                    **signature_options: Any) -> List[List[int]]:
+    """One graph per isomorphism class of `order`, as neighbour bitsets."""
+    if order == 0:
+        return [[]]
+    level = None
+    for level in generate_levels(order, workers, **signature_options):
+        pass
+    return level.graphs
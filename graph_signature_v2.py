@@ -1,7 +1,17 @@
+import hashlib
 import string
-from typing import Dict, List, Optional
-from functools import total_ordering
-import networkx as nx
+import sys
+from array import array
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+from functools import cmp_to_key, total_ordering
+from operator import index as _as_index
+
+from graph6 import bitsets_to_adjacency, bitsets_to_graph6, graph6_to_adjacency
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+    from tracing import PassEvent
 
 
 def compare_ascending_none_last(a: Optional[int], b: Optional[int]) -> int:
@@ -15,18 +25,91 @@ def compare_ascending_none_last(a: Optional[int], b: Optional[int]) -> int:
     return -1 if a < b else 1
 
 
+def _render_tree(root: Any, head: Callable[[Any], str],
+                 children: Callable[[Any], Optional[Sequence[Any]]],
+                 opening: str, separator: str) -> str:
+    """Renders `{head,opening[child<separator>child...]}` with an explicit stack.
+
+    Children are rendered the same way; `children` returns None or an empty
+    sequence for entries printed without a neighbour list.
+    """
+    out: List[str] = []
+    stack: List[Any] = [root]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            out.append(item)
+            continue
+        out.append("{" + head(item))
+        kids = children(item)
+        if not kids:
+            out.append("}")
+            continue
+        out.append("," + opening + "[")
+        stack.append("]}")
+        for position in range(len(kids) - 1, -1, -1):
+            stack.append(kids[position])
+            if position:
+                stack.append(separator)
+    return "".join(out)
+
+
+def _describe_head(sig: Any) -> str:
+    parts = []
+    if sig.label is not None:
+        parts.append(f"label:{sig.label}")
+    parts.append(f"neighbour_count:{sig.neighbour_count}")
+    if sig.final_index is not None:
+        parts.append(f"final_index:{sig.final_index}")
+    if sig.resolution_step is not None:
+        parts.append(f"resolution_step:{sig.resolution_step}")
+    if sig.loop_length is not None:
+        parts.append(f"loop_length:{sig.loop_length}")
+    return ','.join(parts)
+
+
+def _sig_head(neighbour_count: int, final_index: Optional[int],
+              resolution_step: Optional[int], loop_length: Optional[int]) -> str:
+    parts = []
+    parts.append(f"nc:{neighbour_count}")
+    if final_index is not None:
+        parts.append(f"fi:{final_index}")
+    if resolution_step is not None:
+        parts.append(f"rs:{resolution_step}")
+    if loop_length is not None:
+        parts.append(f"ll:{loop_length}")
+    return ','.join(parts)
+
+
+def _ancestor_depths(sig: "NodeSignature") -> Dict["Node", int]:
+    """Node -> depth for `sig` (depth 0) and its ancestors (negative depths)."""
+    depths: Dict[Node, int] = {}
+    depth = 0
+    while sig is not None:
+        depths[sig.node] = depth
+        sig = sig.parent_sig
+        depth -= 1
+    return depths
+
+
+def _printed_neighbours(sig: Any) -> Optional[Sequence[Any]]:
+    return sig.neighbours if sig.is_expanded and sig.neighbours else None
+
+
 class Node:
     def __init__(
         self,
         label: str,
         neighbour_count: int,
         final_index: Optional[int] = None,
-        resolution_step: Optional[int] = None
+        resolution_step: Optional[int] = None,
+        index: Optional[int] = None
     ):
         self.label: str = label
         self.neighbour_count: int = neighbour_count
         self.final_index: Optional[int] = final_index
         self.resolution_step: Optional[int] = resolution_step
+        self.index: Optional[int] = index
         self.neighbours: List["Node"] = []
 
     @property
@@ -52,38 +135,29 @@ class NodeSignature:
         self.loop_length: Optional[int] = loop_length
         self.neighbours: Optional[List["NodeSignature"]] = neighbours
         self.parent_sig: Optional["NodeSignature"] = parent_sig
+        # Collapsed non-loop leaves below, reached without passing a finalized
+        # node; a collapsed signature counts itself. See _open_leaves. Only an
+        # upper bound: finalizing a node leaves the counts above it as they
+        # were, and expand_node recounts the subtrees it walks.
+        self.open_leaves: int = (
+            (0 if loop_length is not None else 1) if neighbours is None
+            else sum(_open_leaves(neighbour) for neighbour in neighbours))
 
     def __str__(self) -> str:
-        parts = []
-        if self.label is not None:
-            parts.append(f"label:{self.label}")
-        parts.append(f"neighbour_count:{self.neighbour_count}")
-        if self.final_index is not None:
-            parts.append(f"final_index:{self.final_index}")
-        if self.resolution_step is not None:
-            parts.append(f"resolution_step:{self.resolution_step}")
-        if self.loop_length is not None:
-            parts.append(f"loop_length:{self.loop_length}")
-
-        if self.is_expanded and self.neighbours:
-            neighbour_details = [str(n_sig) for n_sig in self.neighbours]
-            parts.append(f"neighbours:[{', '.join(neighbour_details)}]")
-
-        return "{" + ','.join(parts)+"}"
+        return _render_tree(self, _describe_head, _printed_neighbours, "neighbours:", ", ")
 
     def sig(self) -> str:
-        parts = []
-        parts.append(f"nc:{self.neighbour_count}")
-        if self.final_index is not None:
-            parts.append(f"fi:{self.final_index}")
-        if self.resolution_step is not None:
-            parts.append(f"rs:{self.resolution_step}")
-        if self.loop_length is not None:
-            parts.append(f"ll:{self.loop_length}")
-        if self.is_expanded and self.neighbours:
-            neighbour_details = [n_sig.sig() for n_sig in self.neighbours]
-            parts.append(f"n:[{','.join(neighbour_details)}]")
-        return "{" + ','.join(parts) + "}"
+        return _render_tree(
+            self,
+            lambda sig: _sig_head(sig.neighbour_count, sig.final_index,
+                                  sig.resolution_step, sig.loop_length),
+            _printed_neighbours, "n:", ",")
+
+    def digest(self) -> bytes:
+        """Fixed-size hash of sig(), see SignatureDigest."""
+        folder = SignatureDigest()
+        folder.add_signature(self)
+        return folder.digest()
 
     @property
     def neighbour_count(self) -> bool:
@@ -132,89 +206,1295 @@ class NodeSignature:
         return compare_signatures(self, other) < 0
 
 
+def _open_leaves(sig: NodeSignature) -> int:
+    """Leaves below `sig` that expand_node would still expand: 0 under a loop or a finalized node."""
+    if sig.loop_length is not None or sig.node.final_index is not None:
+        return 0
+    return sig.open_leaves
+
+
+def _add_open_leaves(sig: NodeSignature, delta: int) -> None:
+    """Adds `delta` to the open_leaves of the ancestors of `sig`, up to the first finalized one."""
+    parent = sig.parent_sig
+    while parent is not None and delta:
+        parent.open_leaves += delta
+        if parent.node.final_index is not None:
+            break
+        parent = parent.parent_sig
+
+
 def compare_signatures(sig_a: NodeSignature, sig_b: NodeSignature) -> int:
-    """Compares two signatures based on a set of hierarchical rules."""
-    diff_nc = sig_b.neighbour_count - sig_a.neighbour_count
-    if diff_nc != 0:  # 1. By neighbour_count (descending)
-        return diff_nc
-
-    fs_cmp = compare_ascending_none_last(
-        sig_a.resolution_step, sig_b.resolution_step)
-    if fs_cmp != 0:  # 2. resolution_step step
-        return fs_cmp
-
-    cd_cmp = compare_ascending_none_last(sig_a.loop_length, sig_b.loop_length)
-    if cd_cmp != 0:  # 3. loop_length
-        return cd_cmp
-
-    fi_cmp = compare_ascending_none_last(sig_a.final_index, sig_b.final_index)
-    if fi_cmp != 0:  # 4. final_index
-        return fi_cmp
-
-    has_n_a = sig_a.neighbours is not None
-    has_n_b = sig_b.neighbours is not None
-    if has_n_a != has_n_b:
-        # The signature with neighbours (EXPANDED) comes first
-        return -1 if has_n_a else 1
-
-    if has_n_a and has_n_b:
-        # The length of neighbours should be the same if neighbour_count is the same
-        for i in range(len(sig_a.neighbours)):
-            comparison_result = compare_signatures(
-                sig_a.neighbours[i], sig_b.neighbours[i]
-            )
-            if comparison_result != 0:
-                return comparison_result
+    """Compares two signatures based on a set of hierarchical rules.
+
+    Both trees are walked depth-first in step, with an explicit stack of
+    pairs still to compare, so deep trees do not hit the recursion limit.
+    """
+    pending: List[Tuple[NodeSignature, NodeSignature]] = []
+    while True:
+        node_a = sig_a.node
+        node_b = sig_b.node
+        diff_nc = node_b.neighbour_count - node_a.neighbour_count
+        if diff_nc != 0:  # 1. By neighbour_count (descending)
+            return diff_nc
+
+        if node_a.resolution_step != node_b.resolution_step:  # 2. resolution_step step
+            return compare_ascending_none_last(
+                node_a.resolution_step, node_b.resolution_step)
+
+        if sig_a.loop_length != sig_b.loop_length:  # 3. loop_length
+            return compare_ascending_none_last(sig_a.loop_length, sig_b.loop_length)
+
+        if node_a.final_index != node_b.final_index:  # 4. final_index
+            return compare_ascending_none_last(node_a.final_index, node_b.final_index)
+
+        neighbours_a = sig_a.neighbours
+        neighbours_b = sig_b.neighbours
+        has_n_a = neighbours_a is not None
+        has_n_b = neighbours_b is not None
+        if has_n_a != has_n_b:
+            # The signature with neighbours (EXPANDED) comes first
+            return -1 if has_n_a else 1
+
+        if has_n_a and has_n_b:
+            # The length of neighbours should be the same if neighbour_count is the same.
+            # Pushed in reverse so that the first pair is compared first.
+            pending.extend(zip(reversed(neighbours_a), reversed(neighbours_b)))
+
+        if not pending:
+            # signatures are considered equal or ambiguous for now.
+            return 0
+        sig_a, sig_b = pending.pop()
+
+
+_NONE_LAST = sys.maxsize
+
+
+def _key_head(neighbour_count: int, resolution_step: Optional[int],
+              loop_length: Optional[int], final_index: Optional[int]) -> tuple:
+    return (
+        -neighbour_count,
+        _NONE_LAST if resolution_step is None else resolution_step,
+        _NONE_LAST if loop_length is None else loop_length,
+        _NONE_LAST if final_index is None else final_index,
+    )
+
+
+def _signature_key_head(sig: NodeSignature) -> tuple:
+    node = sig.node
+    resolution_step = node.resolution_step
+    loop_length = sig.loop_length
+    final_index = node.final_index
+    return (
+        -node.neighbour_count,
+        _NONE_LAST if resolution_step is None else resolution_step,
+        _NONE_LAST if loop_length is None else loop_length,
+        _NONE_LAST if final_index is None else final_index,
+    )
+
+
+def signature_sort_key(sig: NodeSignature) -> tuple:
+    """Returns a hashable key that orders signatures exactly like compare_signatures.
+
+    The key is (-neighbour_count, resolution_step, loop_length, final_index)
+    with None mapped after every integer, followed by 0 and the neighbour keys
+    for an expanded signature, or by 1 for a collapsed one.
+
+    Keys are built without recursion, but they are nested tuples and Python
+    compares those recursively, so sort_keys=True is limited to trees less
+    deep than the recursion limit; the default compare-based sorts are not.
+    """
+    return _build_sort_key(sig, lambda sig: sig.neighbours, _signature_key_head)
+
+
+def _build_sort_key(root: Any, children: Callable[[Any], Optional[Sequence[Any]]],
+                    head: Callable[[Any], tuple]) -> tuple:
+    """Builds the nested sort key of a tree bottom-up with an explicit stack."""
+    keys: List[tuple] = []
+    stack: List[Tuple[Any, bool]] = [(root, False)]
+    while stack:
+        item, children_done = stack.pop()
+        kids = children(item)
+        if kids is None:
+            keys.append(head(item) + (1,))
+        elif children_done:
+            first = len(keys) - len(kids)
+            key = head(item) + (0,) + tuple(keys[first:])
+            del keys[first:]
+            keys.append(key)
+        else:
+            stack.append((item, True))
+            stack.extend((kid, False) for kid in reversed(kids))
+    return keys[0]
+
+
+def _none_if_negative(value: int) -> Optional[int]:
+    return None if value < 0 else value
+
+
+DIGEST_SIZE = 16
+# Fields are flushed to the hash in blocks of this many integers.
+_DIGEST_BLOCK = 4096
+
+
+class SignatureDigest:
+    """Folds signature trees into a BLAKE2b hash, in the order sig() prints them.
+
+    Every tree entry contributes five integers: neighbour_count,
+    final_index, resolution_step and loop_length (-1 for None) and the
+    number of neighbours sig() would print. In pre-order that sequence is
+    prefix-free, so two trees get the same digest exactly when their sig()
+    strings are equal (up to hash collisions), without building the strings.
+    """
+
+    def __init__(self, digest_size: int = DIGEST_SIZE):
+        self.hasher = hashlib.blake2b(digest_size=digest_size)
+        self.fields = array('q')
+
+    def _flush(self) -> None:
+        if sys.byteorder == "big":
+            self.fields.byteswap()
+        self.hasher.update(self.fields.tobytes())
+        del self.fields[:]
+
+    def add_count(self, count: int) -> None:
+        self.fields.append(count)
+
+    def add_certificate(self, certificate: Sequence[Tuple[int, Sequence[int]]]) -> None:
+        """Adds a colour refinement certificate, each class as size, length, colours."""
+        self.fields.append(len(certificate))
+        for size, colours in certificate:
+            self.fields.extend((size, len(colours)))
+            self.fields.extend(colours)
+            if len(self.fields) >= _DIGEST_BLOCK:
+                self._flush()
+
+    def add_signature(self, sig: "NodeSignature") -> None:
+        fields = self.fields
+        extend = fields.extend
+        stack = [sig]
+        pop, push = stack.pop, stack.extend
+        while stack:
+            current = pop()
+            node = current.node
+            final_index = node.final_index
+            resolution_step = node.resolution_step
+            loop_length = current.loop_length
+            children = current.neighbours or ()
+            extend((
+                node.neighbour_count,
+                -1 if final_index is None else final_index,
+                -1 if resolution_step is None else resolution_step,
+                -1 if loop_length is None else loop_length,
+                len(children),
+            ))
+            push(reversed(children))
+            if len(fields) >= _DIGEST_BLOCK:
+                self._flush()
+
+    def add_tree_row(self, tree: "SignatureTreeArrays", row: int) -> None:
+        """Adds one row of a SignatureTreeArrays or SharedSignatureTrees."""
+        fields = self.fields
+        nodes = tree.nodes
+        node_index, loop_length = tree.node_index, tree.loop_length
+        children = tree.children
+        stack = [row]
+        while stack:
+            current = stack.pop()
+            node = nodes[node_index[current]]
+            kids = children(current) or ()
+            fields.extend((
+                node.neighbour_count,
+                -1 if node.final_index is None else node.final_index,
+                -1 if node.resolution_step is None else node.resolution_step,
+                loop_length[current],
+                len(kids),
+            ))
+            stack.extend(reversed(kids))
+            if len(fields) >= _DIGEST_BLOCK:
+                self._flush()
+
+    def digest(self) -> bytes:
+        self._flush()
+        return self.hasher.digest()
+
+
+class _SignatureTreeRows:
+    """What SignatureTreeArrays and SharedSignatureTrees share: tree entries are
+    rows of a node_index and a loop_length array (-1 for no loop), and
+    subclasses give their children with children(row).
+    """
+
+    def __init__(self, nodes: List[Node], sort_keys: bool = False):
+        self.nodes: List[Node] = nodes
+        self.sort_keys: bool = sort_keys
+        self.node_index = array('i')
+        self.loop_length = array('i')
+
+    def node(self, row: int) -> Node:
+        return self.nodes[self.node_index[row]]
+
+    def children(self, row: int) -> Optional[Sequence[int]]:
+        raise NotImplementedError
+
+    def _same_entry(self, row_a: int, row_b: int) -> bool:
+        """Whether two rows are known to compare equal without looking further."""
+        return False
+
+    def compare(self, row_a: int, row_b: int) -> int:
+        """Row counterpart of compare_signatures."""
+        pending: List[Tuple[int, int]] = []
+        while True:
+            if not self._same_entry(row_a, row_b):
+                node_a = self.node(row_a)
+                node_b = self.node(row_b)
+                diff_nc = node_b.neighbour_count - node_a.neighbour_count
+                if diff_nc != 0:
+                    return diff_nc
+
+                if node_a.resolution_step != node_b.resolution_step:
+                    return compare_ascending_none_last(
+                        node_a.resolution_step, node_b.resolution_step)
+
+                loop_a = self.loop_length[row_a]
+                loop_b = self.loop_length[row_b]
+                if loop_a != loop_b:
+                    return compare_ascending_none_last(
+                        _none_if_negative(loop_a), _none_if_negative(loop_b))
+
+                if node_a.final_index != node_b.final_index:
+                    return compare_ascending_none_last(
+                        node_a.final_index, node_b.final_index)
+
+                children_a = self.children(row_a)
+                children_b = self.children(row_b)
+                if (children_a is None) != (children_b is None):
+                    return -1 if children_a is not None else 1
+
+                if children_a is not None:
+                    pending.extend(zip(reversed(children_a), reversed(children_b)))
+
+            if not pending:
+                return 0
+            row_a, row_b = pending.pop()
+
+    def _key_head(self, row: int) -> tuple:
+        node = self.node(row)
+        return _key_head(node.neighbour_count, node.resolution_step,
+                         _none_if_negative(self.loop_length[row]), node.final_index)
+
+    def _sig_head(self, row: int) -> str:
+        node = self.node(row)
+        return _sig_head(node.neighbour_count, node.final_index, node.resolution_step,
+                         _none_if_negative(self.loop_length[row]))
+
+    def sig(self, row: int) -> str:
+        return _render_tree(row, self._sig_head, self.children, "n:", ",")
+
+
+class SignatureTreeArrays(_SignatureTreeRows):
+    """Stores a forest of signature trees in flat typed arrays.
+
+    Each tree entry is a row shared by five parallel arrays: node index,
+    parent index, loop_length, child offset and child count. The children of
+    an expanded entry occupy a contiguous block of rows, kept in sorted order.
+    Missing values (no parent, no loop, collapsed) are stored as -1.
+    """
 
-    # signatures are considered equal or ambiguous for now.
-    return 0
+    def __init__(self, nodes: List[Node], sort_keys: bool = False):
+        super().__init__(nodes, sort_keys)
+        self.parent_index = array('i')
+        self.child_offset = array('i')
+        self.child_count = array('i')
+
+    def __len__(self) -> int:
+        return len(self.node_index)
+
+    def _append(self, node_index: int, parent_index: int, loop_length: int) -> int:
+        row = len(self.node_index)
+        self.node_index.append(node_index)
+        self.parent_index.append(parent_index)
+        self.loop_length.append(loop_length)
+        self.child_offset.append(-1)
+        self.child_count.append(0)
+        return row
+
+    def add_root(self, node: Node) -> "ArrayNodeSignature":
+        return ArrayNodeSignature(self, self._append(node.index, -1, -1))
+
+    def children(self, row: int) -> Optional[range]:
+        offset = self.child_offset[row]
+        if offset < 0:
+            return None
+        return range(offset, offset + self.child_count[row])
+
+    def is_expanded(self, row: int) -> bool:
+        return self.child_offset[row] >= 0
+
+    def parent(self, row: int) -> int:
+        return self.parent_index[row]
+
+    def share_children(self, row: int, source: int) -> None:
+        """Makes root `row` list the children of root `source`, which stay source's."""
+        self.child_offset[row] = self.child_offset[source]
+        self.child_count[row] = self.child_count[source]
+
+    def ancestor_depths(self, row: int) -> Dict[int, int]:
+        """node index -> depth for `row` (depth 0) and its ancestors (negative depths)."""
+        depths: Dict[int, int] = {}
+        depth = 0
+        while row >= 0:
+            depths[self.node_index[row]] = depth
+            row = self.parent_index[row]
+            depth -= 1
+        return depths
+
+    def expand(self, row: int, ancestors: Optional[Dict[int, int]] = None) -> bool:
+        """Array counterpart of GraphSignatures.expand_signature_node.
+
+        `ancestors` maps the node indices on the path from the root to `row`
+        (row included) to their depth; it is built here when not given.
+        """
+        node = self.node(row)
+        if node.is_finalized or self.child_offset[row] >= 0 or self.loop_length[row] >= 0:
+            return False
+        if ancestors is None:
+            ancestors = self.ancestor_depths(row)
+        depth = ancestors[self.node_index[row]] + 1
+
+        offset = len(self.node_index)
+        for neighbour_node in node.neighbours:
+            target = neighbour_node.index
+            ancestor_depth = ancestors.get(target)
+            loop_len = -1 if ancestor_depth is None else depth - ancestor_depth
+            self._append(target, row, loop_len)
+
+        self.child_offset[row] = offset
+        self.child_count[row] = len(node.neighbours)
+        self.sort_children(row)
+        return True
+
+    def expand_node(self, row: int) -> bool:
+        """Array counterpart of GraphSignatures.expand_node."""
+        results: List[bool] = []
+        # Depth of each node on the path from `row` to the current entry.
+        ancestors = self.ancestor_depths(row)
+        depth_offset = ancestors.pop(self.node_index[row])
+        stack: List[Tuple[int, int, bool]] = [(row, depth_offset, False)]
+        while stack:
+            current, depth, children_done = stack.pop()
+            children = self.children(current)
+            if children_done:
+                del ancestors[self.node_index[current]]
+                first = len(results) - len(children)
+                any_expansion_occurred = any(results[first:])
+                del results[first:]
+                if any_expansion_occurred:
+                    self.sort_children(current)
+                results.append(any_expansion_occurred)
+            elif self.loop_length[current] >= 0 or self.node(current).is_finalized:
+                results.append(False)
+            elif children is None:
+                ancestors[self.node_index[current]] = depth
+                results.append(self.expand(current, ancestors))
+                del ancestors[self.node_index[current]]
+            else:
+                ancestors[self.node_index[current]] = depth
+                stack.append((current, depth, True))
+                stack.extend((child, depth + 1, False) for child in reversed(children))
+        return results[0]
+
+    def expand_node_keyed(self, row: int) -> Tuple[bool, tuple]:
+        """Like expand_node, also returning the sort key of the updated subtree."""
+        results: List[Tuple[bool, tuple]] = []
+        ancestors = self.ancestor_depths(row)
+        depth_offset = ancestors.pop(self.node_index[row])
+        stack: List[Tuple[int, int, bool]] = [(row, depth_offset, False)]
+        while stack:
+            current, depth, children_done = stack.pop()
+            children = self.children(current)
+            if children_done:
+                del ancestors[self.node_index[current]]
+                first = len(results) - len(children)
+                any_expansion_occurred = any(expanded for expanded, _ in results[first:])
+                child_keys = [key for _, key in results[first:]]
+                del results[first:]
+                if any_expansion_occurred:
+                    child_keys = self.sort_children(current, child_keys)
+                results.append((any_expansion_occurred,
+                                self._key_head(current) + (0,) + tuple(child_keys)))
+            elif self.loop_length[current] >= 0 or self.node(current).is_finalized:
+                results.append((False, self.sort_key(current)))
+            elif children is None:
+                ancestors[self.node_index[current]] = depth
+                self.expand(current, ancestors)
+                del ancestors[self.node_index[current]]
+                results.append((True, self.sort_key(current)))
+            else:
+                ancestors[self.node_index[current]] = depth
+                stack.append((current, depth, True))
+                stack.extend((child, depth + 1, False) for child in reversed(children))
+        return results[0]
+
+    def sort_children(self, row: int, child_keys: Optional[List[tuple]] = None) -> Optional[List[tuple]]:
+        """Stable-sorts the child block of `row`, moving grandchildren parent links along.
+
+        When sort keys are used, returns the children keys in their new order.
+        """
+        children = self.children(row)
+        if child_keys is None and self.sort_keys and children is not None:
+            child_keys = [self.sort_key(child) for child in children]
+        if children is None or len(children) < 2:
+            return child_keys
+
+        if child_keys is None:
+            order = sorted(children, key=cmp_to_key(self.compare))
+        else:
+            positions = sorted(range(len(children)), key=child_keys.__getitem__)
+            order = [children[p] for p in positions]
+            child_keys = [child_keys[p] for p in positions]
+        if order == list(children):
+            return child_keys
+
+        moved = [
+            (self.node_index[r], self.loop_length[r],
+             self.child_offset[r], self.child_count[r])
+            for r in order
+        ]
+        for new_row, (node_index, loop_length, child_offset, child_count) in zip(children, moved):
+            self.node_index[new_row] = node_index
+            self.loop_length[new_row] = loop_length
+            self.child_offset[new_row] = child_offset
+            self.child_count[new_row] = child_count
+            if child_offset >= 0:
+                for grandchild in range(child_offset, child_offset + child_count):
+                    self.parent_index[grandchild] = new_row
+        return child_keys
+
+    def sort_key(self, row: int) -> tuple:
+        """Array counterpart of signature_sort_key."""
+        return _build_sort_key(row, self.children, self._key_head)
+
+
+@total_ordering
+class ArrayNodeSignature:
+    """A NodeSignature-compatible view of one row of a SignatureTreeArrays or SharedSignatureTrees."""
+
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree: SignatureTreeArrays, index: int):
+        self.tree = tree
+        self.index = index
+
+    def __str__(self) -> str:
+        return _render_tree(self, _describe_head, _printed_neighbours, "neighbours:", ", ")
+
+    def sig(self) -> str:
+        return self.tree.sig(self.index)
+
+    def digest(self) -> bytes:
+        folder = SignatureDigest()
+        folder.add_tree_row(self.tree, self.index)
+        return folder.digest()
+
+    @property
+    def node(self) -> Node:
+        return self.tree.node(self.index)
+
+    @property
+    def loop_length(self) -> Optional[int]:
+        return _none_if_negative(self.tree.loop_length[self.index])
+
+    @property
+    def neighbours(self) -> Optional[List["ArrayNodeSignature"]]:
+        children = self.tree.children(self.index)
+        if children is None:
+            return None
+        return [ArrayNodeSignature(self.tree, child) for child in children]
+
+    @property
+    def parent_sig(self) -> Optional["ArrayNodeSignature"]:
+        parent = self.tree.parent(self.index)
+        return None if parent < 0 else ArrayNodeSignature(self.tree, parent)
+
+    @property
+    def neighbour_count(self) -> int:
+        return self.node.neighbour_count
+
+    @property
+    def final_index(self) -> Optional[int]:
+        return self.node.final_index
+
+    @property
+    def resolution_step(self) -> Optional[int]:
+        return self.node.resolution_step
+
+    @property
+    def label(self) -> str:
+        return self.node.label
+
+    @property
+    def is_finalized(self) -> bool:
+        return self.node.is_finalized
+
+    @property
+    def is_resolved(self) -> bool:
+        return self.node.is_resolved
+
+    @property
+    def is_collapsed(self) -> bool:
+        return not self.tree.is_expanded(self.index)
+
+    @property
+    def is_expanded(self) -> bool:
+        return self.tree.is_expanded(self.index)
+
+    @property
+    def is_loop(self) -> bool:
+        return self.tree.loop_length[self.index] >= 0
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ArrayNodeSignature):
+            return NotImplemented
+        return self.tree.compare(self.index, other.index) == 0
+
+    def __lt__(self, other: object) -> bool:
+        if not isinstance(other, ArrayNodeSignature):
+            return NotImplemented
+        return self.tree.compare(self.index, other.index) < 0
+
+
+class SharedSignatureTrees(_SignatureTreeRows):
+    """Stores signature trees as a DAG in which equal subtrees are one entry.
+
+    The first rows are the roots, one per node, and are updated in place.
+    Every other entry is hash-consed on (node index, loop_length, children):
+    building an entry that already exists returns the existing row, so a
+    subtree reached along many paths is built, compared and keyed once.
+    Children keep the order they were last sorted in, as in the other
+    backends, so that order is part of an entry's identity.
+
+    This is a trade of memory for work, not a memory saving: an entry costs
+    its intern key, children tuple and memo slots, several times a
+    NodeSignature, and uses more memory than the objects backend unless
+    subtrees repeat very often (2.6 MB against 1.1 MB on the Petersen graph).
+
+    Entries below the roots never change. Expanding a tree rebuilds the
+    entries above its new leaves, and rebuilds are memoized on the entry and
+    on the ancestors outside it that its new leaves are adjacent to, which
+    is all that decides their loop lengths. Rebuilds, compare results, sort
+    keys and frontiers depend on which nodes are finalized; GraphSignatures
+    calls clear_caches() whenever it finalizes one.
+    """
+
+    def __init__(self, nodes: List[Node], sort_keys: bool = False):
+        super().__init__(nodes, sort_keys)
+        # Children rows of each entry, None while collapsed.
+        self.child_rows: List[Optional[Tuple[int, ...]]] = []
+        self.root_count: int = 0
+        self._interned: Dict[Tuple[int, int, Optional[Tuple[int, ...]]], int] = {}
+        # Neighbours of each node as a bitset, plus one bit past the last node
+        # so that a leaf without neighbours still counts as expandable.
+        self._leaf_bits: List[int] = [
+            sum(1 << neighbour.index for neighbour in node.neighbours) | 1 << len(nodes)
+            for node in nodes
+        ]
+        self._keys: Dict[int, tuple] = {}
+        # Shape numbers, see _shape.
+        self._shapes: Dict[int, int] = {}
+        self._shape_ids: Dict[tuple, int] = {}
+        self._frontiers: Dict[int, int] = {}
+        self._rebuilt: Dict[Tuple[int, ...], int] = {}
+
+    def __len__(self) -> int:
+        """Entries created so far, including ones no tree refers to any more."""
+        return len(self.node_index)
+
+    def _append(self, node_index: int, loop_length: int,
+                children: Optional[Tuple[int, ...]]) -> int:
+        row = len(self.node_index)
+        self.node_index.append(node_index)
+        self.loop_length.append(loop_length)
+        self.child_rows.append(children)
+        return row
+
+    def _intern(self, node_index: int, loop_length: int,
+                children: Optional[Tuple[int, ...]]) -> int:
+        key = (node_index, loop_length, children)
+        row = self._interned.get(key)
+        if row is None:
+            row = self._interned[key] = self._append(node_index, loop_length, children)
+        return row
+
+    def add_root(self, node: Node) -> ArrayNodeSignature:
+        if len(self) != self.root_count:
+            raise ValueError("Roots must be added before any tree is expanded.")
+        self.root_count += 1
+        return ArrayNodeSignature(self, self._append(node.index, -1, None))
+
+    def _check_root(self, row: int) -> None:
+        if row >= self.root_count:
+            raise ValueError(f"Entry {row} is shared; only roots can be expanded.")
+
+    def children(self, row: int) -> Optional[Tuple[int, ...]]:
+        return self.child_rows[row]
+
+    def is_expanded(self, row: int) -> bool:
+        return self.child_rows[row] is not None
+
+    def parent(self, row: int) -> int:
+        """Always -1: a shared entry has no single parent."""
+        return -1
+
+    def share_children(self, row: int, source: int) -> None:
+        """SignatureTreeArrays.share_children."""
+        self._check_root(row)
+        self.child_rows[row] = self.child_rows[source]
+
+    def clear_caches(self) -> None:
+        self._keys.clear()
+        self._shapes.clear()
+        self._shape_ids.clear()
+        self._frontiers.clear()
+        self._rebuilt.clear()
+
+    def clear_rebuilds(self) -> None:
+        """Forgets the rebuilds of the last pass, whose entries the trees no longer use."""
+        self._rebuilt.clear()
+
+    def _sorted(self, rows: List[int]) -> Tuple[int, ...]:
+        if self.sort_keys:
+            return tuple(sorted(rows, key=self.sort_key))
+        return tuple(sorted(rows, key=cmp_to_key(self.compare)))
+
+    def _leaf_children(self, row: int, ancestors: Dict[int, int]) -> Tuple[int, ...]:
+        depth = ancestors[self.node_index[row]] + 1
+        children = []
+        for neighbour_node in self.node(row).neighbours:
+            ancestor_depth = ancestors.get(neighbour_node.index)
+            loop_len = -1 if ancestor_depth is None else depth - ancestor_depth
+            children.append(self._intern(neighbour_node.index, loop_len, None))
+        return self._sorted(children)
+
+    def expand(self, row: int, ancestors: Optional[Dict[int, int]] = None) -> bool:
+        """SignatureTreeArrays.expand for a root."""
+        self._check_root(row)
+        if self.node(row).is_finalized or self.child_rows[row] is not None:
+            return False
+        if ancestors is None:
+            ancestors = {self.node_index[row]: 0}
+        self.child_rows[row] = self._leaf_children(row, ancestors)
+        return True
+
+    def expand_leaf(self, row: int, ancestors: Dict[int, int]) -> int:
+        """The entry for leaf `row` with its neighbours as children."""
+        return self._intern(self.node_index[row], self.loop_length[row],
+                            self._leaf_children(row, ancestors))
+
+    def _frontier(self, row: int) -> int:
+        """Bitset of the nodes the expandable leaves below `row` would get as children."""
+        frontiers = self._frontiers
+        results: List[int] = []
+        stack: List[Tuple[int, bool]] = [(row, False)]
+        while stack:
+            current, children_done = stack.pop()
+            children = self.child_rows[current]
+            if children_done:
+                bits = 0
+                for child_bits in results[len(results) - len(children):]:
+                    bits |= child_bits
+                del results[len(results) - len(children):]
+            elif current in frontiers:
+                results.append(frontiers[current])
+                continue
+            elif self.loop_length[current] >= 0 or self.node(current).is_finalized:
+                bits = 0
+            elif children is None:
+                bits = self._leaf_bits[self.node_index[current]]
+            else:
+                stack.append((current, True))
+                stack.extend((child, False) for child in children)
+                continue
+            if current >= self.root_count:
+                frontiers[current] = bits
+            results.append(bits)
+        return results[0]
+
+    def _rebuild(self, row: int, ancestors: Dict[int, int], depth: int) -> int:
+        """The entry `row` becomes when all its expandable leaves are expanded.
+
+        `ancestors` maps the node indices on the path above `row` to their
+        depth; `row` is at `depth`. `ancestors` is left as it was found.
+        """
+        rebuilt = self._rebuilt
+        results: List[int] = []
+        stack: List[Tuple[int, int, Optional[Tuple[int, ...]]]] = [(row, depth, None)]
+        while stack:
+            current, depth, key = stack.pop()
+            children = self.child_rows[current]
+            if key is not None:
+                del ancestors[self.node_index[current]]
+                first = len(results) - len(children)
+                new_children = results[first:]
+                del results[first:]
+                if tuple(new_children) == children:
+                    new_row = current
+                else:
+                    new_row = self._intern(self.node_index[current], self.loop_length[current],
+                                           self._sorted(new_children))
+                rebuilt[key] = new_row
+                results.append(new_row)
+                continue
+
+            frontier = self._frontier(current)
+            if not frontier:
+                results.append(current)
+                continue
+            key = (current,) + tuple(
+                value for node_index, ancestor_depth in ancestors.items()
+                if frontier >> node_index & 1 for value in (node_index, depth - ancestor_depth))
+            new_row = rebuilt.get(key)
+            if new_row is not None:
+                results.append(new_row)
+                continue
+            ancestors[self.node_index[current]] = depth
+            if children is None:
+                new_row = rebuilt[key] = self.expand_leaf(current, ancestors)
+                del ancestors[self.node_index[current]]
+                results.append(new_row)
+            else:
+                stack.append((current, depth, key))
+                stack.extend((child, depth + 1, None) for child in reversed(children))
+        return results[0]
+
+    def expand_node(self, row: int) -> bool:
+        """SignatureTreeArrays.expand_node for a root."""
+        self._check_root(row)
+        if self.node(row).is_finalized:
+            return False
+        children = self.child_rows[row]
+        if children is None:
+            return self.expand(row)
+        ancestors = {self.node_index[row]: 0}
+        new_children = [self._rebuild(child, ancestors, 1) for child in children]
+        if tuple(new_children) == children:
+            return False
+        self.child_rows[row] = self._sorted(new_children)
+        return True
+
+    def expand_node_keyed(self, row: int) -> Tuple[bool, tuple]:
+        """Like expand_node, also returning the sort key of the updated tree."""
+        expanded = self.expand_node(row)
+        return expanded, self.sort_key(row)
+
+    def sort_key(self, row: int) -> tuple:
+        """SignatureTreeArrays.sort_key; an entry's key is built once and shared."""
+        keys_by_row = self._keys
+        keys: List[tuple] = []
+        stack: List[Tuple[int, bool]] = [(row, False)]
+        while stack:
+            current, children_done = stack.pop()
+            children = self.child_rows[current]
+            if children_done:
+                first = len(keys) - len(children)
+                key = self._key_head(current) + (0,) + tuple(keys[first:])
+                del keys[first:]
+            elif current in keys_by_row:
+                keys.append(keys_by_row[current])
+                continue
+            elif children is None:
+                key = self._key_head(current) + (1,)
+            else:
+                stack.append((current, True))
+                stack.extend((child, False) for child in reversed(children))
+                continue
+            if current >= self.root_count:
+                keys_by_row[current] = key
+            keys.append(key)
+        return keys[0]
+
+    def _shape(self, row: int) -> int:
+        """Number shared by exactly the entries that compare equal to `row`."""
+        shapes = self._shapes
+        results: List[int] = []
+        stack: List[Tuple[int, bool]] = [(row, False)]
+        while stack:
+            current, children_done = stack.pop()
+            children = self.child_rows[current]
+            if children_done:
+                first = len(results) - len(children)
+                child_shapes: Optional[tuple] = tuple(results[first:])
+                del results[first:]
+            elif current in shapes:
+                results.append(shapes[current])
+                continue
+            elif children is None:
+                child_shapes = None
+            else:
+                stack.append((current, True))
+                stack.extend((child, False) for child in reversed(children))
+                continue
+            node = self.node(current)
+            key = (node.neighbour_count, node.resolution_step, self.loop_length[current],
+                   node.final_index, child_shapes)
+            shape = self._shape_ids.setdefault(key, len(self._shape_ids))
+            if current >= self.root_count:
+                shapes[current] = shape
+            results.append(shape)
+        return results[0]
+
+    def _same_entry(self, row_a: int, row_b: int) -> bool:
+        """Equal rows, or entries with the same shape, compare equal: compare skips them."""
+        return row_a == row_b or self._shape(row_a) == self._shape(row_b)
+
+
+TREE_BACKENDS = ("objects", "arrays", "shared")
+SCHEDULERS = ("full", "partition")
+
+
+def _vertex(value: Any, order: int) -> int:
+    """`value` as a vertex index of a graph with `order` vertices, or ValueError."""
+    try:
+        vertex = _as_index(value)
+    except TypeError:
+        raise ValueError(f"Vertex {value!r} is not an integer.") from None
+    if not 0 <= vertex < order:
+        raise ValueError(f"Vertex {vertex} is out of range for {order} vertices.")
+    return vertex
+
+
+def _validate_adjacency(adjacency: Sequence[Sequence[Any]]) -> None:
+    """Raises ValueError unless `adjacency` is a simple undirected graph on 0..n-1:
+    indices in range, no loops, no repeated neighbours, and u lists v iff v lists u.
+
+    Every from_* builder ends in from_adjacency_lists, which runs this check.
+    """
+    order = len(adjacency)
+    neighbour_sets: List[Set[int]] = []
+    for v, neighbours in enumerate(adjacency):
+        seen: Set[int] = set()
+        for neighbour in neighbours:
+            neighbour = _vertex(neighbour, order)
+            if neighbour == v:
+                raise ValueError(f"Loop at vertex {v}: signatures are for simple graphs.")
+            if neighbour in seen:
+                raise ValueError(f"Edge {v}-{neighbour} is listed twice.")
+            seen.add(neighbour)
+        neighbour_sets.append(seen)
+    for v, seen in enumerate(neighbour_sets):
+        for neighbour in seen:
+            if v not in neighbour_sets[neighbour]:
+                raise ValueError(f"Graph is not symmetric: {v}-{neighbour} has no reverse.")
 
 
 class GraphSignatures:
-    """Manages the computation of canonical signatures for a graph."""
+    """Manages the computation of canonical signatures for a graph.
+
+    `tree_backend` selects how signature trees are stored: "objects" builds a
+    NodeSignature per tree entry, "arrays" keeps every tree in a single
+    SignatureTreeArrays, "shared" in a SharedSignatureTrees where equal
+    subtrees are built, compared and keyed once, at a memory cost per
+    entry. With "shared" only the roots can be expanded one by one, and
+    entries have no parent_sig. With `sort_keys`, every sort uses
+    signature_sort_key instead of compare_signatures; keys are built
+    bottom-up once per pass.
+    `scheduler` picks what a pass re-sorts: "full" sorts all_signatures,
+    "partition" keeps it as ordered cells of still-equal signatures and only
+    re-sorts and splits those, so finalized singletons drop out of the work.
+    All combinations produce identical `sig()` output.
+
+    With `refine`, a NumPy colour refinement pass (see refinement.py) runs
+    first: vertices alone in their colour class start finalized with
+    resolution_step 0, and sig()/digest() are prefixed by the refinement
+    certificate. Refined signatures are only comparable with each other.
+
+    With `share_orbits`, the automorphism orbits of the vertices are found
+    first (see automorphisms.py and orbits()); only the first vertex of each
+    orbit has its tree expanded, and the other roots of the orbit list the
+    same children. Orbit-mates then always sort as equal, where separate
+    trees could be told apart by the order vertices were finalized in, so
+    these signatures too are only comparable with each other.
 
-    def __init__(self, graph: nx.Graph):
-        self.graph: nx.Graph = graph 
-        self.nodes_map: Dict[str, Node] = {}
+    The constructor reads a networkx graph. The from_* class methods build the
+    same structures from graph6 bytes, adjacency lists or matrices, CSR arrays
+    or edge lists without networkx; there vertices are numbered 0..n-1,
+    `graph` is None and labels are optional.
+    """
 
-        for node_label_nx in self.graph.nodes():
+    def __init__(self, graph: "nx.Graph", tree_backend: str = "objects",
+                 sort_keys: bool = False, scheduler: str = "full", refine: bool = False,
+                 share_orbits: bool = False):
+        if graph.is_directed() or graph.is_multigraph():
+            raise ValueError("Signatures are for simple undirected graphs, "
+                             f"got a {type(graph).__name__}.")
+        self.graph: Optional["nx.Graph"] = graph
+        self.nodes_map: Dict[Union[str, int], Node] = {}
+
+        nodes_by_nx_label: Dict[Any, Node] = {}
+        for index, node_label_nx in enumerate(self.graph.nodes()):
+            if node_label_nx in self.graph.adj[node_label_nx]:
+                raise ValueError(
+                    f"Loop at vertex {node_label_nx!r}: signatures are for simple graphs.")
             label_str = str(node_label_nx)
-            self.nodes_map[label_str] = Node(
+            node_obj = Node(
                 label=label_str,
-                neighbour_count=self.graph.degree(node_label_nx)
+                neighbour_count=self.graph.degree(node_label_nx),
+                index=index
             )
+            self.nodes_map[label_str] = node_obj
+            nodes_by_nx_label[node_label_nx] = node_obj
+
+        for node_label_nx, node_obj in nodes_by_nx_label.items():
+            for neighbour_label_nx in self.graph.neighbors(node_label_nx):
+                node_obj.neighbours.append(nodes_by_nx_label[neighbour_label_nx])
+
+        self._init_signatures(tree_backend, sort_keys, scheduler, refine, share_orbits)
+
+    @classmethod
+    def from_adjacency_lists(cls, adjacency: Sequence[Sequence[int]],
+                             labels: Optional[Sequence[str]] = None,
+                             **options: Any) -> "GraphSignatures":
+        """Builds signatures for vertices 0..n-1 from their neighbour lists.
+
+        Neighbours keep the given order. `labels`, if given, become the node
+        labels and nodes_map keys; otherwise nodes_map is keyed by vertex index.
+        `options` are the GraphSignatures keyword arguments. ValueError unless
+        the lists describe a simple undirected graph (see _validate_adjacency).
+        """
+        if labels is not None and len(labels) != len(adjacency):
+            raise ValueError(
+                f"Got {len(labels)} labels for {len(adjacency)} vertices.")
+        _validate_adjacency(adjacency)
+        gs = cls.__new__(cls)
+        gs.graph = None
+        nodes = [
+            Node(label=None if labels is None else labels[index],
+                 neighbour_count=len(neighbours),
+                 index=index)
+            for index, neighbours in enumerate(adjacency)
+        ]
+        for node_obj, neighbours in zip(nodes, adjacency):
+            node_obj.neighbours = [nodes[neighbour] for neighbour in neighbours]
+        gs.nodes_map = {
+            index if labels is None else node_obj.label: node_obj
+            for index, node_obj in enumerate(nodes)
+        }
+        gs._init_signatures(**options)
+        return gs
+
+    @classmethod
+    def from_graph6(cls, data: Union[bytes, str],
+                    labels: Optional[Sequence[str]] = None,
+                    **options: Any) -> "GraphSignatures":
+        """Builds signatures from one graph6 string, with or without header."""
+        return cls.from_adjacency_lists(graph6_to_adjacency(data), labels, **options)
+
+    @classmethod
+    def from_edge_list(cls, order: int, edges: Iterable[Tuple[int, int]],
+                       labels: Optional[Sequence[str]] = None,
+                       **options: Any) -> "GraphSignatures":
+        """Builds signatures for vertices 0..order-1 from (u, v) pairs, each edge once."""
+        adjacency: List[List[int]] = [[] for _ in range(order)]
+        for u, v in edges:
+            u, v = _vertex(u, order), _vertex(v, order)
+            adjacency[u].append(v)
+            adjacency[v].append(u)
+        for neighbours in adjacency:
+            neighbours.sort()
+        return cls.from_adjacency_lists(adjacency, labels, **options)
+
+    @classmethod
+    def from_bitsets(cls, rows: Sequence[int],
+                     labels: Optional[Sequence[str]] = None,
+                     **options: Any) -> "GraphSignatures":
+        """Builds signatures from one neighbour bitset per vertex (bit j of rows[i] is edge i-j)."""
+        for vertex, row in enumerate(rows):
+            if row < 0:
+                raise ValueError(f"Bitset of vertex {vertex} is negative.")
+        return cls.from_adjacency_lists(bitsets_to_adjacency(rows), labels, **options)
+
+    @classmethod
+    def from_csr(cls, indptr: Sequence[int], indices: Sequence[int],
+                 labels: Optional[Sequence[str]] = None,
+                 **options: Any) -> "GraphSignatures":
+        """Builds signatures from a symmetric CSR structure (e.g. scipy.sparse indptr/indices)."""
+        if len(indptr) == 0 or indptr[0] != 0 or indptr[-1] != len(indices) or any(
+                indptr[v] > indptr[v + 1] for v in range(len(indptr) - 1)):
+            raise ValueError("indptr must rise from 0 to len(indices).")
+        adjacency = [
+            sorted(indices[indptr[v]:indptr[v + 1]]) for v in range(len(indptr) - 1)
+        ]
+        return cls.from_adjacency_lists(adjacency, labels, **options)
+
+    @classmethod
+    def from_adjacency_matrix(cls, matrix: Any,
+                              labels: Optional[Sequence[str]] = None,
+                              **options: Any) -> "GraphSignatures":
+        """Builds signatures from a symmetric 0/1 adjacency matrix (NumPy array or nested lists)."""
+        import numpy as np
+
+        matrix = np.asarray(matrix)
+        if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+            raise ValueError(f"Expected a square matrix, got shape {matrix.shape}.")
+        if not np.isin(matrix, (0, 1)).all():
+            raise ValueError("Adjacency matrix entries must be 0 or 1, weights are not supported.")
+        rows, cols = np.nonzero(matrix)
+        indptr = np.searchsorted(rows, np.arange(matrix.shape[0] + 1))
+        adjacency = [cols[indptr[v]:indptr[v + 1]].tolist()
+                     for v in range(matrix.shape[0])]
+        return cls.from_adjacency_lists(adjacency, labels, **options)
+
+    def _init_signatures(self, tree_backend: str = "objects", sort_keys: bool = False,
+                         scheduler: str = "full", refine: bool = False,
+                         share_orbits: bool = False) -> None:
+        if tree_backend not in TREE_BACKENDS:
+            raise ValueError(
+                f"Unknown tree backend {tree_backend!r}, expected one of {TREE_BACKENDS}.")
+        if scheduler not in SCHEDULERS:
+            raise ValueError(
+                f"Unknown scheduler {scheduler!r}, expected one of {SCHEDULERS}.")
+        self.tree_backend: str = tree_backend
+        self.sort_keys: bool = sort_keys
+        self.scheduler: str = scheduler
+        self.refine: bool = refine
+        self.share_orbits: bool = share_orbits
+        self.certificate: Optional[tuple] = None
+        self.refinement_rounds: int = 0
+        # Passes run by the last compute_all_signatures.
+        self.passes: int = 0
+        if refine:
+            self._seed_from_refinement()
+        self.tree: Optional[Union[SignatureTreeArrays, SharedSignatureTrees]] = None
+        if tree_backend == "arrays":
+            self.tree = SignatureTreeArrays(
+                list(self.nodes_map.values()), sort_keys=sort_keys)
+        elif tree_backend == "shared":
+            self.tree = SharedSignatureTrees(
+                list(self.nodes_map.values()), sort_keys=sort_keys)
 
-        for node_obj in self.nodes_map.values():
-            for neighbour_label_nx in self.graph.neighbors(node_obj.label):
-                neighbour_node_obj = self.nodes_map[str(neighbour_label_nx)]
-                node_obj.neighbours.append(neighbour_node_obj)
-        
         self.signatures_map: Dict[str, NodeSignature] = {
-            label: NodeSignature(node=node_obj)
+            label: self.tree.add_root(node_obj) if self.tree is not None
+            else NodeSignature(node=node_obj)
             for label, node_obj in self.nodes_map.items()
         }
         self.all_signatures: List[NodeSignature] = list(
             self.signatures_map.values())
+        # Sort keys of root signatures by id(), valid until a tree or node changes.
+        self._keys: Dict[int, tuple] = {}
+        # Runs of equal signatures found by the last sort, while still valid.
+        self._runs: Optional[List[Tuple[int, int]]] = None
+        # "partition" scheduler: for each neighbour_count, in descending order,
+        # the start of its block in all_signatures, how many finalized
+        # signatures open the block, and the ordered cells of equal ones.
+        self._degrees: List[int] = []
+        self._block_start: Dict[int, int] = {}
+        self._finalized_count: Dict[int, int] = {}
+        self._cells: Optional[Dict[int, List[List[NodeSignature]]]] = None
+        # Orbits of the vertices, once orbits() found them; with share_orbits,
+        # (member, representative) root pairs and the ids of the members.
+        self._orbits: Optional[List[List[Node]]] = None
+        self._orbit_roots: List[Tuple[NodeSignature, NodeSignature]] = []
+        self._orbit_members: Set[int] = set()
+        if share_orbits:
+            # all_signatures is still in node index order.
+            for orbit in self._vertex_orbits():
+                representative = self.all_signatures[orbit[0]]
+                for vertex in orbit[1:]:
+                    member = self.all_signatures[vertex]
+                    self._orbit_roots.append((member, representative))
+                    self._orbit_members.add(id(member))
+
+    def _vertex_orbits(self) -> List[List[int]]:
+        """Automorphism orbits of the vertex indices (see automorphisms.py)."""
+        from automorphisms import automorphism_orbits
+
+        nodes = list(self.nodes_map.values())
+        orbits, _ = automorphism_orbits(
+            [[neighbour.index for neighbour in node_obj.neighbours] for node_obj in nodes])
+        self._orbits = [[nodes[vertex] for vertex in orbit] for orbit in orbits]
+        return orbits
+
+    def orbits(self) -> List[List[Union[str, int]]]:
+        """The automorphism orbits of the vertices, as lists of nodes_map keys.
+
+        Vertices in one orbit are exchanged by an automorphism, so a search
+        over vertices only needs one branch per orbit. Computed once per graph.
+        """
+        if self._orbits is None:
+            self._vertex_orbits()
+        keys = {id(node_obj): key for key, node_obj in self.nodes_map.items()}
+        return [[keys[id(node_obj)] for node_obj in orbit] for orbit in self._orbits]
+
+    def _seed_from_refinement(self) -> None:
+        """Finalizes, before the first pass, the nodes colour refinement singles out."""
+        from refinement import adjacency_to_csr, certificate, refine_colours, singleton_ranks
+
+        nodes = list(self.nodes_map.values())
+        indptr, indices = adjacency_to_csr(
+            [[neighbour.index for neighbour in node_obj.neighbours] for node_obj in nodes])
+        colours, self.refinement_rounds = refine_colours(indptr, indices)
+        self.certificate = certificate(indptr, indices, colours)
+        degrees = [node_obj.neighbour_count for node_obj in nodes]
+        for vertex, final_index in singleton_ranks(colours, degrees):
+            nodes[vertex].final_index = final_index
+            nodes[vertex].resolution_step = 0
+
+    def compare(self, sig_a: NodeSignature, sig_b: NodeSignature) -> int:
+        if self.tree is not None:
+            return self.tree.compare(sig_a.index, sig_b.index)
+        return compare_signatures(sig_a, sig_b)
+
+    def sort_key(self, sig: NodeSignature) -> tuple:
+        if self.tree is not None:
+            return self.tree.sort_key(sig.index)
+        return signature_sort_key(sig)
+
+    @property
+    def _scheduled(self) -> bool:
+        return self.sort_keys or self.scheduler == "partition"
+
+    def _invalidate(self) -> None:
+        self._keys.clear()
+        self._runs = None
+
+    def _root_key(self, sig: NodeSignature) -> tuple:
+        key = self._keys.get(id(sig))
+        if key is None:
+            key = self._keys[id(sig)] = self.sort_key(sig)
+        return key
+
+    def _same(self, sig_a: NodeSignature, sig_b: NodeSignature) -> bool:
+        if self.sort_keys:
+            return self._root_key(sig_a) == self._root_key(sig_b)
+        return self.compare(sig_a, sig_b) == 0
+
+    def _split_runs(self, sigs: List[NodeSignature]) -> List[List[NodeSignature]]:
+        runs: List[List[NodeSignature]] = []
+        for sig in sigs:
+            if runs and self._same(runs[-1][-1], sig):
+                runs[-1].append(sig)
+            else:
+                runs.append([sig])
+        return runs
+
+    def _sort_all(self) -> None:
+        """The "full" scheduler's sort of all_signatures."""
+        self.all_signatures.sort()
+
+    def _sorted_runs(self) -> List[Tuple[int, int]]:
+        """Sorts the signatures that can still move and returns the runs of equal ones.
+
+        Runs are (start, end) ranges of all_signatures, in order. The "full"
+        scheduler sorts the whole list, "partition" only the ambiguous cells.
+        """
+        if self._runs is None:
+            if self.scheduler == "partition":
+                self._runs = self._refine_cells()
+            else:
+                self.all_signatures.sort(
+                    key=self._root_key if self.sort_keys else None)
+                self._runs = []
+                start = 0
+                for run in self._split_runs(self.all_signatures):
+                    self._runs.append((start, start + len(run)))
+                    start += len(run)
+        return self._runs
+
+    def _init_cells(self) -> None:
+        by_degree: Dict[int, List[NodeSignature]] = {}
+        for sig in self.all_signatures:
+            by_degree.setdefault(sig.neighbour_count, []).append(sig)
+        self._degrees = sorted(by_degree, reverse=True)
+        self._cells = {}
+
+        start = 0
+        for degree in self._degrees:
+            members = by_degree[degree]
+            finalized = sorted(
+                (sig for sig in members if sig.is_finalized),
+                key=lambda sig: (_NONE_LAST if sig.resolution_step is None
+                                 else sig.resolution_step, sig.final_index))
+            ambiguous = [sig for sig in members if not sig.is_finalized]
+            self.all_signatures[start:start + len(members)] = finalized + ambiguous
+            self._block_start[degree] = start
+            self._finalized_count[degree] = len(finalized)
+            self._cells[degree] = [ambiguous] if ambiguous else []
+            start += len(members)
+
+    def _refine_cells(self) -> List[Tuple[int, int]]:
+        """"partition" scheduler: re-sorts and splits the ambiguous cells.
+
+        all_signatures holds one block per neighbour_count, in descending
+        order. A block opens with its finalized signatures, which compare on
+        (resolution_step, final_index) alone and so never move again, followed
+        by the cells of still-equal signatures. Signatures finalized since the
+        last call leave their cell for the end of the finalized part; the
+        remaining cells are sorted, split into runs, and the runs reordered by
+        their first signature. Blocks without cells are not touched.
+        """
+        if self._cells is None:
+            self._init_cells()
+        sort_key = self._root_key if self.sort_keys else cmp_to_key(self.compare)
+
+        runs: List[Tuple[int, int]] = []
+        for degree in self._degrees:
+            cells = self._cells[degree]
+            if not cells:
+                continue
+
+            newly_finalized: List[NodeSignature] = []
+            refined: List[List[NodeSignature]] = []
+            for cell in cells:
+                ambiguous = []
+                for sig in cell:
+                    (newly_finalized if sig.is_finalized else ambiguous).append(sig)
+                ambiguous.sort(key=sort_key)
+                refined.extend(self._split_runs(ambiguous))
+            newly_finalized.sort(key=lambda sig: (sig.resolution_step, sig.final_index))
+            refined.sort(key=lambda cell: sort_key(cell[0]))
+
+            start = self._block_start[degree] + self._finalized_count[degree]
+            self._finalized_count[degree] += len(newly_finalized)
+            self.all_signatures[start:start + len(newly_finalized)] = newly_finalized
+            start += len(newly_finalized)
+            for cell in refined:
+                self.all_signatures[start:start + len(cell)] = cell
+                runs.append((start, start + len(cell)))
+                start += len(cell)
+            self._cells[degree] = refined
+        return runs
+
+    def _ambiguous_signatures(self) -> List[NodeSignature]:
+        if self.scheduler == "partition" and self._cells is not None:
+            return [sig for cells in self._cells.values()
+                    for cell in cells for sig in cell if not sig.is_finalized]
+        return [sig for sig in self.all_signatures if not sig.is_finalized]
 
     def expand_signature_node(self, sig_to_expand: NodeSignature, pass_number: int) -> bool:
+        self._invalidate()
+        return self._expand_signature_node(sig_to_expand, pass_number)
+
+    def _expand_signature_node(self, sig_to_expand: NodeSignature, pass_number: int,
+                               ancestors: Optional[Dict[Node, int]] = None) -> bool:
+        """Expands one collapsed signature into its neighbours.
+
+        `ancestors` maps the nodes on the path from the root to `sig_to_expand`
+        (included) to their depth, so that a neighbour's loop_length is one
+        lookup; when not given it is built by walking parent_sig once.
+        """
+        if self.tree is not None:
+            return self.tree.expand(sig_to_expand.index, ancestors)
         if sig_to_expand.is_finalized or sig_to_expand.is_expanded or sig_to_expand.is_loop:
             return False
+        if ancestors is None:
+            ancestors = _ancestor_depths(sig_to_expand)
+        depth = ancestors[sig_to_expand.node] + 1
 
         new_neighbours_sigs: List[NodeSignature] = []
         
         for neighbour_node in sig_to_expand.node.neighbours:
-            neighbour_label = neighbour_node.label
-            loop_len: Optional[int] = None
-
-            parent_iterator = sig_to_expand
-            distance_counter = 1
-            while parent_iterator is not None:
-                if parent_iterator.node.label == neighbour_label: 
-                    loop_len = distance_counter
-                    break
-                parent_iterator = parent_iterator.parent_sig
-                distance_counter += 1
-            
+            ancestor_depth = ancestors.get(neighbour_node)
+            loop_len: Optional[int] = None if ancestor_depth is None else depth - ancestor_depth
+
             new_neighbour_sig = NodeSignature(
                 node=neighbour_node, 
                 loop_length=loop_len,
@@ -222,12 +1502,18 @@ class GraphSignatures:
             )
             new_neighbours_sigs.append(new_neighbour_sig)
 
-        new_neighbours_sigs.sort()
+        new_neighbours_sigs.sort(
+            key=signature_sort_key if self.sort_keys else None)
         sig_to_expand.neighbours = new_neighbours_sigs 
+        open_leaves = sum(_open_leaves(sig) for sig in new_neighbours_sigs)
+        _add_open_leaves(sig_to_expand, open_leaves - sig_to_expand.open_leaves)
+        sig_to_expand.open_leaves = open_leaves
         return True
 
     def process_pass(self, pass_number: int) -> bool:
-        self.all_signatures.sort()
+        if self._scheduled:
+            return self._process_pass_scheduled(pass_number)
+        self._sort_all()
         made_progress = False
         for i, sig in enumerate(self.all_signatures):
             if sig.is_finalized:
@@ -246,7 +1532,8 @@ class GraphSignatures:
                 #     if 0 <= sig.final_index < len(self.all_signatures):
                 #         sig_at_original_pos = self.all_signatures[sig.final_index]
                 #         error_message_parts.append(
-                #             f"  Signature currently at index {sig.final_index} (original position of problematic sig): {str(sig_at_original_pos)}"
+                #             f"  Signature currently at index {sig.final_index} "
+                #             f"(original position of problematic sig): {str(sig_at_original_pos)}"
                 #         )
                 #         if sig_at_original_pos is sig:
                 #             error_message_parts.append(
@@ -256,68 +1543,405 @@ class GraphSignatures:
                 #                 "    (Note: A different signature now occupies the original final_index.)")
                 #     else:
                 #         error_message_parts.append(
-                #             f"  Original final_index {sig.final_index} is currently out of bounds for the list (len: {len(self.all_signatures)})."
+                #             f"  Original final_index {sig.final_index} is currently out of bounds "
+                #             f"for the list (len: {len(self.all_signatures)})."
                 #         )
 
                 #     raise Exception("\n".join(error_message_parts))
                 continue
 
             is_unique_from_prev = (i == 0) or (
-                compare_signatures(sig, self.all_signatures[i - 1]) != 0)
+                self.compare(sig, self.all_signatures[i - 1]) != 0)
             is_unique_from_next = (i == len(self.all_signatures) - 1) or (
-                compare_signatures(sig, self.all_signatures[i + 1]) != 0)
+                self.compare(sig, self.all_signatures[i + 1]) != 0)
 
             if is_unique_from_prev and is_unique_from_next:
-                sig.node.final_index = i
-                sig.node.resolution_step = pass_number
+                self._finalize(sig, i, pass_number)
                 made_progress = True
 
         return made_progress
 
+    def _finalize(self, sig: NodeSignature, final_index: int, pass_number: int) -> None:
+        sig.node.final_index = final_index
+        sig.node.resolution_step = pass_number
+        if self.tree_backend == "shared":
+            self.tree.clear_caches()
+
+    def _process_pass_scheduled(self, pass_number: int) -> bool:
+        sigs = self.all_signatures
+        made_progress = False
+        for start, end in self._sorted_runs():
+            for i in range(start, end):
+                sig = sigs[i]
+                if sig.is_finalized:
+                    continue
+
+                # Runs are separated by differences that finalizing a node
+                # cannot undo. Inside a run, a node finalized earlier in this
+                # pass may tell signatures apart that sorted as equal.
+                is_unique_from_prev = (i == start) or (
+                    made_progress and self.compare(sig, sigs[i - 1]) != 0)
+                is_unique_from_next = (i == end - 1) or (
+                    made_progress and self.compare(sig, sigs[i + 1]) != 0)
+
+                if is_unique_from_prev and is_unique_from_next:
+                    self._finalize(sig, i, pass_number)
+                    made_progress = True
+
+        if made_progress:
+            self._invalidate()
+        return made_progress
+
     def all_are_finalized(self) -> bool:
+        if self.scheduler == "partition" and self._cells is not None:
+            return not self._ambiguous_signatures()
         return all(node.is_finalized for node in self.nodes_map.values())
 
     def expand_ambiguous_nodes(self, pass_number: int) -> bool:
+        if self.tree_backend == "shared":
+            self.tree.clear_rebuilds()
+        if self._scheduled:
+            return self._expand_ambiguous_nodes_scheduled(pass_number)
         any_expansion_occurred = False
         for sig_obj in list(self.all_signatures):
-            if not sig_obj.is_finalized:
+            if not sig_obj.is_finalized and id(sig_obj) not in self._orbit_members:
                 if self.expand_node(sig_obj, pass_number):
                     any_expansion_occurred = True
 
         if any_expansion_occurred:
-            self.all_signatures.sort()
+            self._share_orbit_trees()
+            self._sort_all()
         return any_expansion_occurred
 
-    def expand_node(self, sig_obj: "NodeSignature", pass_number: int) -> bool:
-        if sig_obj.is_loop or sig_obj.is_finalized:
-            return False
-
+    def _expand_ambiguous_nodes_scheduled(self, pass_number: int) -> bool:
         any_expansion_occurred = False
-        if sig_obj.is_expanded:
-            for neighbor_sig in sig_obj.neighbours:
-                if self.expand_node(neighbor_sig, pass_number):
-                    any_expansion_occurred = True
-        else:
-            self.expand_signature_node(sig_obj, pass_number)
-            any_expansion_occurred = True
+        for sig_obj in self._ambiguous_signatures():
+            if id(sig_obj) in self._orbit_members:
+                continue
+            if self.sort_keys:
+                expanded, self._keys[id(sig_obj)] = self._expand_node_keyed(
+                    sig_obj, pass_number)
+            else:
+                expanded = self.expand_node(sig_obj, pass_number)
+            if expanded:
+                any_expansion_occurred = True
 
-        if any_expansion_occurred and sig_obj.neighbours is not None:
-            sig_obj.neighbours.sort()
+        self._runs = None
+        if any_expansion_occurred:
+            self._share_orbit_trees()
+            self._sorted_runs()
         return any_expansion_occurred
 
-    def compute_all_signatures(self):
-        pass_number = 1
-        max_passes = len(self.graph.nodes()) * 2 + 5
-        while pass_number <= max_passes and not self.all_are_finalized():
-            made_progress = self.process_pass(pass_number)
-            if not made_progress:
-                if not self.expand_ambiguous_nodes(pass_number):
+    def _share_orbit_trees(self) -> None:
+        """share_orbits: points each orbit member's root at its representative's children.
+
+        An automorphism maps the representative's tree onto the member's, so
+        the member's own expansion is skipped. Both roots stay equal, and
+        so unfinalized, for as long as the trees are shared.
+        """
+        for member, representative in self._orbit_roots:
+            if self.tree is not None:
+                self.tree.share_children(member.index, representative.index)
+            else:
+                member.neighbours = representative.neighbours
+                member.open_leaves = representative.open_leaves
+            # Once either root is finalized, their heads, and so keys, differ.
+            if member.is_finalized or representative.is_finalized:
+                continue
+            key = self._keys.get(id(representative))
+            if key is not None:
+                self._keys[id(member)] = key
+
+    def _expand_node_keyed(self, sig_obj: "NodeSignature", pass_number: int) -> Tuple[bool, tuple]:
+        """Like expand_node, also returning the sort key of the updated subtree."""
+        if self.tree is not None:
+            return self.tree.expand_node_keyed(sig_obj.index)
+        results: List[Tuple[bool, tuple]] = []
+        ancestors = _ancestor_depths(sig_obj)
+        depth_offset = ancestors.pop(sig_obj.node)
+        stack: List[Tuple[NodeSignature, int, bool]] = [(sig_obj, depth_offset, False)]
+        while stack:
+            current, depth, children_done = stack.pop()
+            if children_done:
+                del ancestors[current.node]
+                first = len(results) - len(current.neighbours)
+                any_expansion_occurred = any(expanded for expanded, _ in results[first:])
+                child_keys = [key for _, key in results[first:]]
+                del results[first:]
+                if any_expansion_occurred:
+                    positions = sorted(range(len(child_keys)), key=child_keys.__getitem__)
+                    current.neighbours[:] = [current.neighbours[p] for p in positions]
+                    child_keys = [child_keys[p] for p in positions]
+                current.open_leaves = sum(_open_leaves(child) for child in current.neighbours)
+                results.append((any_expansion_occurred,
+                                _signature_key_head(current) + (0,) + tuple(child_keys)))
+            elif not _open_leaves(current):
+                results.append((False, signature_sort_key(current)))
+            elif current.neighbours is None:
+                ancestors[current.node] = depth
+                self._expand_signature_node(current, pass_number, ancestors)
+                del ancestors[current.node]
+                results.append((True, signature_sort_key(current)))
+            else:
+                ancestors[current.node] = depth
+                stack.append((current, depth, True))
+                stack.extend((neighbor_sig, depth + 1, False)
+                             for neighbor_sig in reversed(current.neighbours))
+        return results[0]
+
+    def expand_node(self, sig_obj: "NodeSignature", pass_number: int) -> bool:
+        """Expands the leaves of a signature tree by one level, re-sorting the
+        neighbour lists below which something was expanded.
+
+        Post-order walk with an explicit stack: each entry is visited once on
+        the way down and once more after its neighbours are done. The depths
+        of the nodes on the current path are kept in a dict for loop lengths.
+        Subtrees without open leaves are not entered, so a pass only walks
+        the paths down to the leaves it expands. Counts left too high by
+        finalized nodes are corrected on the way back up, so each subtree
+        closed by a finalization is walked once more at most.
+        """
+        self._invalidate()
+        if self.sort_keys:
+            return self._expand_node_keyed(sig_obj, pass_number)[0]
+        if self.tree is not None:
+            return self.tree.expand_node(sig_obj.index)
+
+        results: List[bool] = []
+        ancestors = _ancestor_depths(sig_obj)
+        depth_offset = ancestors.pop(sig_obj.node)
+        stack: List[Tuple[NodeSignature, int, bool]] = [(sig_obj, depth_offset, False)]
+        while stack:
+            current, depth, children_done = stack.pop()
+            if children_done:
+                del ancestors[current.node]
+                first = len(results) - len(current.neighbours)
+                any_expansion_occurred = any(results[first:])
+                del results[first:]
+                if any_expansion_occurred:
+                    current.neighbours.sort()
+                current.open_leaves = sum(_open_leaves(child) for child in current.neighbours)
+                results.append(any_expansion_occurred)
+            elif not _open_leaves(current):
+                results.append(False)
+            elif current.is_expanded:
+                ancestors[current.node] = depth
+                stack.append((current, depth, True))
+                stack.extend((neighbor_sig, depth + 1, False)
+                             for neighbor_sig in reversed(current.neighbours))
+            else:
+                ancestors[current.node] = depth
+                self._expand_signature_node(current, pass_number, ancestors)
+                del ancestors[current.node]
+                results.append(True)
+        return results[0]
+
+    def compute_all_signatures(self, observer: Optional[Callable[["PassEvent"], None]] = None):
+        """Runs passes until every node is finalized or nothing changes.
+
+        `observer`, when given, is called with a tracing.PassEvent after each
+        pass. Without one, no timing or counting code runs.
+        """
+        for _ in self.run_passes(observer):
+            pass
+
+    def run_passes(self, observer: Optional[Callable[["PassEvent"], None]] = None
+                   ) -> Iterator[int]:
+        """compute_all_signatures one pass at a time, yielding each pass number after it ran.
+
+        The final sort only happens once the iterator is exhausted.
+        """
+        tracer = None
+        if observer is not None:
+            from tracing import PassTracer
+
+            tracer = PassTracer(self, observer)
+        try:
+            pass_number = 1
+            max_passes = len(self.nodes_map) * 2 + 5
+            while pass_number <= max_passes and not self.all_are_finalized():
+                if tracer is not None:
+                    tracer.start_pass()
+                made_progress = self.process_pass(pass_number)
+                self.passes = pass_number
+                changed = made_progress or self.expand_ambiguous_nodes(pass_number)
+                if tracer is not None:
+                    tracer.end_pass(pass_number)
+                yield pass_number
+                if not changed:
                     break
+                pass_number += 1
+            if self._scheduled:
+                self._sorted_runs()
+            else:
+                self._sort_all()
+        finally:
+            if tracer is not None:
+                tracer.remove()
+
+    def canonical_labeling(self) -> List[int]:
+        """The new label of each vertex, by Node.index, such that isomorphic
+        graphs relabelled by it are equal.
+
+        The labels come from copies of the graph (this instance keeps its
+        sig()), finalized by _individualize so that the order does not depend
+        on how the vertices were numbered. Where a copy must pick one node of
+        a run of equal signatures, the search branches: one node per orbit of
+        the automorphisms that fix the nodes picked before it (see
+        automorphisms.py), since nodes of one orbit lead to the same
+        relabelled graphs. Of the labelings reached, the one whose relabelled
+        graph has the smallest graph6 is kept, as in individualization-
+        refinement search.
+        """
+        return self._canonical_search()[0]
+
+    def _canonical_search(self) -> Tuple[List[int], bytes]:
+        """canonical_labeling() and the graph6 of the graph it relabels."""
+        from automorphisms import automorphism_orbits
+
+        nodes = sorted(self.nodes_map.values(), key=lambda node_obj: node_obj.index)
+        adjacency = [[neighbour.index for neighbour in node_obj.neighbours]
+                     for node_obj in nodes]
+        best: Optional[Tuple[List[int], bytes]] = None
+        pending: List[List[int]] = [[]]
+        while pending:
+            choices = pending.pop()
+            copy = GraphSignatures.from_adjacency_lists(adjacency, refine=self.refine)
+            run = copy._individualize(choices)
+            while run is not None:
+                orbits, _ = automorphism_orbits(adjacency, choices)
+                orbit_of = {vertex: number for number, orbit in enumerate(orbits)
+                            for vertex in orbit}
+                picks: Dict[int, int] = {}
+                for vertex in run:
+                    picks.setdefault(orbit_of[vertex], vertex)
+                first, *others = picks.values()
+                # The other branches replay their choices on a fresh copy.
+                pending.extend(choices + [vertex] for vertex in reversed(others))
+                choices = choices + [first]
+                run = copy._individualize([first])
+            labeling = copy._final_labeling()
+            form = self.canonical_graph6(labeling)
+            if best is None or form < best[1]:
+                best = (labeling, form)
+        return best
+
+    def _final_labeling(self) -> List[int]:
+        """Labels in the order of the sorted signatures, once every node is finalized."""
+        labeling = [0] * len(self.nodes_map)
+        # Root signatures of finalized nodes sort on this head alone; a pass
+        # gives each position to one node, so no two nodes share it.
+        ranked = sorted(self.nodes_map.values(), key=lambda node_obj: (
+            -node_obj.neighbour_count, node_obj.resolution_step, node_obj.final_index))
+        for label, node_obj in enumerate(ranked):
+            labeling[node_obj.index] = label
+        return labeling
+
+    def _individualize(self, choices: Sequence[int] = ()) -> Optional[List[int]]:
+        """Finalizes every node, one step per pass; returns None when done.
+
+        Unlike process_pass, which can tell signatures apart with a node it
+        finalized earlier in the same pass, a step finalizes all signatures
+        alone in their run at once, then re-sorts the trees so that their
+        neighbour lists are ordered knowing every final_index. When no
+        signature is alone and no tree can grow, one node of the first
+        ambiguous run is finalized instead, at the run's first position:
+        after the sort it follows the finalized ones of its neighbour_count,
+        so its position holds. That node is the next of `choices` (a
+        Node.index in the run); when they are used up, the Node.index of the
+        run's members are returned, and calling again with the node picked
+        resumes with the same pass.
+        """
+        pass_number = self.passes
+        remaining = iter(choices)
+        while not self.all_are_finalized():
             pass_number += 1
-        self.all_signatures.sort()
+            self._sort_all()
+            alone: List[Tuple[int, NodeSignature]] = []
+            ambiguous: Optional[Tuple[int, List[NodeSignature]]] = None
+            position = 0
+            for run in self._split_runs(self.all_signatures):
+                if len(run) == 1 and not run[0].is_finalized:
+                    alone.append((position, run[0]))
+                elif len(run) > 1 and ambiguous is None:
+                    ambiguous = (position, run)
+                position += len(run)
+            if not alone and not self.expand_ambiguous_nodes(pass_number):
+                position, run = ambiguous
+                chosen = next(remaining, None)
+                if chosen is None:
+                    self.passes = pass_number - 1
+                    return [sig.node.index for sig in run]
+                alone.append((position, next(sig for sig in run if sig.node.index == chosen)))
+            for position, sig in alone:
+                self._finalize(sig, position, pass_number)
+            if alone:
+                self._resort_trees()
+        self.passes = pass_number
+        return None
+
+    def _resort_trees(self) -> None:
+        """Re-sorts the neighbour lists of the "objects" trees, deepest lists first.
+
+        Finalized roots compare on their head alone and are skipped.
+        """
+        stack: List[Tuple[NodeSignature, bool]] = [
+            (sig, False) for sig in self.all_signatures if not sig.is_finalized]
+        while stack:
+            current, children_done = stack.pop()
+            if children_done:
+                current.neighbours.sort()
+            elif current.neighbours:
+                stack.append((current, True))
+                stack.extend((neighbour_sig, False) for neighbour_sig in current.neighbours)
+        self._invalidate()
+
+    def canonical_graph6(self, labeling: Optional[List[int]] = None) -> bytes:
+        """graph6 (no header) of the graph relabelled by canonical_labeling().
+
+        n(n-1)/2 bits, so graphs of one order compare as fixed-length strings.
+        `labeling` relabels by another labeling, e.g. a canonical_labeling()
+        the caller already has.
+        """
+        if labeling is None:
+            return self._canonical_search()[1]
+        rows = [0] * len(labeling)
+        for node_obj in self.nodes_map.values():
+            row = 0
+            for neighbour in node_obj.neighbours:
+                row |= 1 << labeling[neighbour.index]
+            rows[labeling[node_obj.index]] = row
+        return bitsets_to_graph6(rows)
 
     def __str__(self) -> str:
         return f"[{','.join(str(sig) for sig in self.all_signatures)}]"
 
     def sig(self) -> str:
-        return f"[{','.join(str(sig.sig()) for sig in self.all_signatures)}]"
+        signatures = f"[{','.join(str(sig.sig()) for sig in self.all_signatures)}]"
+        if self.certificate is None:
+            return signatures
+        classes = ";".join(f"{size}:{','.join(map(str, colours))}"
+                           for size, colours in self.certificate)
+        return f"{{wl:{classes}}}{signatures}"
+
+    def digest(self) -> bytes:
+        """Fixed-size hash of sig(): equal digests mean equal signatures, barring collisions."""
+        folder = SignatureDigest()
+        if self.certificate is not None:
+            folder.add_certificate(self.certificate)
+        folder.add_count(len(self.all_signatures))
+        for sig_obj in self.all_signatures:
+            if self.tree is not None:
+                folder.add_tree_row(self.tree, sig_obj.index)
+            else:
+                folder.add_signature(sig_obj)
+        return folder.digest()
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+
+if __name__ == "__main__":
+    from signature_cli import main
+
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Pairwise isomorphism test that steps both signature computations together.
+
+    result = are_isomorphic(g1, g2)
+    if not result:
+        print(result.rule, result.pass_number, result.detail)
+
+Graph invariants are compared first (the classification.INVARIANTS chain:
+size, degree sequence, triangles, colour refinement certificate); they are
+real invariants, so a difference there is a proof. Then the two
+GraphSignatures run pass by pass and are compared after each pass: the
+positions finalized in that pass are part of the final signature (every
+root prints its final_index and resolution_step), so once they differ the
+sig() strings would differ too and the rest of the passes are skipped.
+
+Signatures are not a complete invariant with the default options: two
+isomorphic graphs can finalize different positions (see validation.py),
+and two non-isomorphic ones could share a signature. So the verdict always
+comes from comparing GraphSignatures.canonical_graph6() of both graphs:
+when signatures differ, `rule` names the first signature check that
+separated them and `detail` says whether the canonical forms confirmed it.
+The answer is exact; the signature walk only tells where the graphs differ.
+"""
+from typing import Any, List, Optional
+
+from classification import INVARIANTS, to_adjacency
+from graph_signature_v2 import GraphSignatures
+
+
+class IsomorphismResult:
+    """Outcome of are_isomorphic; true when the graphs could not be told apart."""
+
+    def __init__(self, isomorphic: bool, rule: Optional[str] = None,
+                 pass_number: Optional[int] = None, detail: str = "", passes: int = 0):
+        self.isomorphic: bool = isomorphic
+        # The check that separated the graphs: an invariant name, "finalized",
+        # "passes" or "signature", or "canonical" when only the canonical forms
+        # differ. None for isomorphic graphs.
+        self.rule: Optional[str] = rule
+        # 0 for the invariants checked before the first pass.
+        self.pass_number: Optional[int] = pass_number
+        self.detail: str = detail
+        # Passes run on each graph before the answer was known.
+        self.passes: int = passes
+
+    def __bool__(self) -> bool:
+        return self.isomorphic
+
+    def __str__(self) -> str:
+        if self.isomorphic:
+            text = f"isomorphic (equal canonical forms after {self.passes} passes)"
+            return f"{text}: {self.detail}" if self.detail else text
+        return f"not isomorphic: {self.rule} differs at pass {self.pass_number} ({self.detail})"
+
+
+def _finalized_in(gs: GraphSignatures, pass_number: int) -> List[int]:
+    return sorted(node.final_index for node in gs.nodes_map.values()
+                  if node.resolution_step == pass_number)
+
+
+def _first_difference(gs_a: GraphSignatures, gs_b: GraphSignatures) -> Optional[int]:
+    """Position of the first differing root signature of two finished computations.
+
+    Compared as sig() strings rather than with compare_signatures, which also
+    tells an expanded leaf from a collapsed one where sig() prints both alike.
+    """
+    for position, (sig_a, sig_b) in enumerate(zip(gs_a.all_signatures, gs_b.all_signatures)):
+        if sig_a.sig() != sig_b.sig():
+            return position
+    return None
+
+
+def _confirmed(gs_a: GraphSignatures, gs_b: GraphSignatures, rule: Optional[str],
+               pass_number: int, detail: str, passes: int) -> IsomorphismResult:
+    """The verdict of the canonical forms, reporting the signature check `rule` that
+    separated the graphs, if any."""
+    if gs_a.canonical_graph6() == gs_b.canonical_graph6():
+        if rule is None:
+            return IsomorphismResult(True, passes=passes)
+        return IsomorphismResult(
+            True, passes=passes,
+            detail=f"signatures differ ({rule} at pass {pass_number}: {detail})")
+    if rule is None:
+        return IsomorphismResult(False, "canonical", passes,
+                                 "equal signatures, different canonical forms", passes)
+    return IsomorphismResult(False, rule, pass_number,
+                             f"{detail}; canonical forms differ", passes)
+
+
+def are_isomorphic(graph_a: Any, graph_b: Any, **signature_options: Any) -> IsomorphismResult:
+    """Whether two graphs are isomorphic, skipping the passes left after the first
+    signature difference.
+
+    Graphs may be in any form classification.to_adjacency accepts;
+    `signature_options` go to GraphSignatures.
+    """
+    adjacency_a = to_adjacency(graph_a)
+    adjacency_b = to_adjacency(graph_b)
+    for name, invariant in INVARIANTS:
+        value_a, value_b = invariant(adjacency_a), invariant(adjacency_b)
+        if value_a != value_b:
+            return IsomorphismResult(False, name, 0, f"{value_a} != {value_b}")
+
+    gs_a = GraphSignatures.from_adjacency_lists(adjacency_a, **signature_options)
+    gs_b = GraphSignatures.from_adjacency_lists(adjacency_b, **signature_options)
+    if _finalized_in(gs_a, 0) != _finalized_in(gs_b, 0):
+        # Only with refine: the vertices seeded before the first pass.
+        return _confirmed(gs_a, gs_b, "finalized", 0, "different refinement singletons", 0)
+    passes_a = gs_a.run_passes()
+    passes_b = gs_b.run_passes()
+    passes = 0
+    while True:
+        pass_a = next(passes_a, None)
+        pass_b = next(passes_b, None)
+        if pass_a is None or pass_b is None:
+            if pass_a != pass_b:
+                return _confirmed(gs_a, gs_b, "passes", passes + 1,
+                                  "one computation finished first", passes)
+            break
+        passes = pass_a
+        finalized_a, finalized_b = _finalized_in(gs_a, passes), _finalized_in(gs_b, passes)
+        if finalized_a != finalized_b:
+            return _confirmed(gs_a, gs_b, "finalized", passes,
+                              f"positions {finalized_a} != {finalized_b}", passes)
+
+    position = _first_difference(gs_a, gs_b)
+    if position is not None:
+        return _confirmed(gs_a, gs_b, "signature", passes,
+                          f"first difference at position {position}", passes)
+    return _confirmed(gs_a, gs_b, None, passes, "", passes)
@@ -0,0 +1,268 @@
+"""Search for Ramsey colourings: 2-colourings of K_n without a red K_s or a blue K_t.
+
+A colouring is stored as its red graph, one neighbour bitset per vertex;
+blue edges are the missing ones. Level n + 1 is built from the colourings of
+level n by adding a vertex whose red neighbourhood S keeps both colours
+clean: S must not contain a red K_{s-1} and the other old vertices must not
+contain a blue K_{t-1}. Those are clique checks on bitsets, done while S is
+built vertex by vertex so a bad prefix is cut off at once. Children that are
+isomorphic (same GraphSignatures.canonical_graph6, up to swapping the
+colours when s == t) are kept once. Every good colouring of K_{n+1} restricts to a good
+colouring of K_n, so when a level comes out empty its order is R(s, t).
+
+    python -m ramsey 3 3                 # R(3,3) = 6, instantly
+    python -m ramsey 3 5                 # R(3,5) = 14, about 3 minutes on one core
+    python -m ramsey 4 4 --circulant 17  # R(4,4) > 17: the Paley colouring
+
+Canonical forms are exact, so the level search never drops a class and an
+empty level proves R(s, t) = n. Signature digests would not do: with the
+default options isomorphic colourings get different digests, and nothing
+guarantees that non-isomorphic ones never share one. refine=True is the
+default since refinement shortens the canonical search.
+
+Colourings of K_17 without a monochromatic K_4 are far too many levels away
+for this search (there are over a million (4,4) colourings of K_12), and the
+signatures of the Paley graph itself do not finish in minutes, so the level
+search gives no bound there. circulant_colourings covers that case:
+colourings of Z_n where the colour of uv only depends on |u - v|, so a
+clique check at vertex 0 covers every vertex. Its isomorph rejection uses
+the multipliers of Z_n instead of signatures, and R(4,4) > 17 comes from it.
+"""
+import argparse
+import itertools
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from graph6 import bitsets_to_graph6
+from graph_signature_v2 import GraphSignatures
+
+
+def has_clique(rows: List[int], candidates: int, size: int) -> bool:
+    """Whether the vertices in the bitset `candidates` contain a clique of `size`."""
+    if size <= 0:
+        return True
+    if bin(candidates).count("1") < size:
+        return False
+    if size == 1:
+        return True
+    while candidates:
+        vertex = (candidates & -candidates).bit_length() - 1
+        candidates &= candidates - 1
+        if has_clique(rows, candidates & rows[vertex], size - 1):
+            return True
+    return False
+
+
+def complement(rows: List[int]) -> List[int]:
+    everyone = (1 << len(rows)) - 1
+    return [everyone & ~row & ~(1 << v) for v, row in enumerate(rows)]
+
+
+def extensions(rows: List[int], s: int, t: int,
+               nodes: Optional[List[int]] = None) -> Iterator[int]:
+    """Red neighbourhoods of the vertices that can join `rows`.
+
+    Old vertices are decided one at a time, red (in S) or blue (out). Adding
+    u to S closes a red K_s with the new vertex when S & N(u) holds a red
+    K_{s-2}; leaving it out does the same for blue with t. Search nodes
+    visited are added to nodes[0].
+    """
+    order = len(rows)
+    blue = complement(rows)
+    nodes = nodes if nodes is not None else [0]
+    # (next vertex, red set, blue set)
+    stack: List[Tuple[int, int, int]] = [(0, 0, 0)]
+    while stack:
+        vertex, red, blue_set = stack.pop()
+        nodes[0] += 1
+        if vertex == order:
+            yield red
+            continue
+        bit = 1 << vertex
+        if not has_clique(blue, blue_set & blue[vertex], t - 2):
+            stack.append((vertex + 1, red, blue_set | bit))
+        if not has_clique(rows, red & rows[vertex], s - 2):
+            stack.append((vertex + 1, red | bit, blue_set))
+
+
+def colouring_key(rows: List[int], s: int, t: int, signature_options: Dict[str, Any]) -> bytes:
+    """Canonical graph6 of the red graph, or the smaller of both colours' when s == t."""
+    return min(GraphSignatures.from_bitsets(graph, **signature_options).canonical_graph6()
+               for graph in ([rows, complement(rows)] if s == t else [rows]))
+
+
+def _children_batch(parents: List[List[int]], s: int, t: int,
+                    signature_options: Dict[str, Any]
+                    ) -> Tuple[List[Tuple[bytes, List[int]]], int, int]:
+    """Non-isomorphic children of a batch of parents, the good extensions and the search nodes."""
+    kept: Dict[bytes, List[int]] = {}
+    found = 0
+    nodes = [0]
+    for rows in parents:
+        bit = 1 << len(rows)
+        for red in extensions(rows, s, t, nodes):
+            found += 1
+            child = [row | bit if (red >> v) & 1 else row for v, row in enumerate(rows)] + [red]
+            kept.setdefault(colouring_key(child, s, t, signature_options), child)
+    return list(kept.items()), found, nodes[0]
+
+
+class RamseyLevel:
+    """The non-isomorphic good colourings of K_order."""
+
+    def __init__(self, order: int, graphs: List[List[int]], extensions: int,
+                 nodes: int, seconds: float):
+        self.order: int = order
+        self.graphs: List[List[int]] = graphs
+        # Good extensions found before isomorph rejection.
+        self.extensions: int = extensions
+        self.nodes: int = nodes
+        self.seconds: float = seconds
+
+    @property
+    def count(self) -> int:
+        return len(self.graphs)
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / max(self.seconds, 1e-9)
+
+    def __str__(self) -> str:
+        return (f"n={self.order}: {self.count} colourings ({self.extensions} before "
+                f"isomorph rejection), {self.nodes} nodes in {self.seconds:.2f}s "
+                f"({self.nodes_per_second:.0f} nodes/s)")
+
+
+def next_level(parents: List[List[int]], s: int, t: int, workers: Optional[int] = None,
+               batch_size: int = 16, **signature_options: Any) -> RamseyLevel:
+    order = len(parents[0]) + 1 if parents else 1
+    workers = workers or os.cpu_count() or 1
+    batches = [parents[i:i + batch_size] for i in range(0, len(parents), batch_size)]
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_children_batch(batch, s, t, signature_options) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_children_batch, batches, itertools.repeat(s),
+                                    itertools.repeat(t), itertools.repeat(signature_options)))
+    kept: Dict[bytes, List[int]] = {}
+    extensions_found = 0
+    nodes = 0
+    for children, batch_found, batch_nodes in results:
+        extensions_found += batch_found
+        nodes += batch_nodes
+        for key, child in children:
+            kept.setdefault(key, child)
+    return RamseyLevel(order, list(kept.values()), extensions_found, nodes,
+                       time.perf_counter() - started)
+
+
+def ramsey_levels(s: int, t: int, max_order: Optional[int] = None,
+                  workers: Optional[int] = None, **signature_options: Any
+                  ) -> Iterator[RamseyLevel]:
+    """Levels 1, 2, ... until one is empty or `max_order` is reached."""
+    if s < 2 or t < 2:
+        raise ValueError(f"Ramsey search needs s, t >= 2, got ({s}, {t}).")
+    signature_options.setdefault("refine", True)
+    level = RamseyLevel(1, [[0]], 1, 0, 0.0)
+    yield level
+    while level.count and (max_order is None or level.order < max_order):
+        level = next_level(level.graphs, s, t, workers, **signature_options)
+        yield level
+
+
+def ramsey_number(s: int, t: int, workers: Optional[int] = None,
+                  **signature_options: Any) -> Tuple[int, List[RamseyLevel]]:
+    """R(s, t), the order of the first empty level, with all levels searched."""
+    levels = list(ramsey_levels(s, t, workers=workers, **signature_options))
+    return levels[-1].order, levels
+
+
+def circulant(order: int, distances: FrozenSet[int]) -> List[int]:
+    """Red graph of Z_order where uv is red when |u - v| mod order is in `distances`."""
+    rows = []
+    for u in range(order):
+        row = 0
+        for d in distances:
+            row |= 1 << ((u + d) % order) | 1 << ((u - d) % order)
+        rows.append(row)
+    return rows
+
+
+def _multiplier_canonical(order: int, distances: FrozenSet[int]) -> Tuple[int, ...]:
+    """Smallest image of `distances` under u -> a u, a a unit of Z_order."""
+    def fold(d: int) -> int:
+        return min(d, order - d)
+    return min(tuple(sorted(fold(a * d % order) for d in distances))
+               for a in range(1, order) if math.gcd(a, order) == 1)
+
+
+def circulant_colourings(order: int, s: int, t: int) -> List[FrozenSet[int]]:
+    """Circulant good colourings of K_order, one per multiplier class.
+
+    Returned as the red distance sets (a subset of 1 .. order // 2).
+    """
+    found: Dict[Tuple[int, ...], FrozenSet[int]] = {}
+    everyone = (1 << order) - 1
+    half = range(1, order // 2 + 1)
+    for size in range(len(half) + 1):
+        for chosen in itertools.combinations(half, size):
+            distances = frozenset(chosen)
+            key = _multiplier_canonical(order, distances)
+            if key in found:
+                continue
+            rows = circulant(order, distances)
+            blue = complement(rows)
+            # Vertex-transitive: a monochromatic clique can be moved onto 0.
+            if has_clique(rows, rows[0], s - 1):
+                continue
+            if has_clique(blue, everyone & ~rows[0] & ~1, t - 1):
+                continue
+            found[key] = distances
+    return list(found.values())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Search 2-colourings of K_n without a red K_s or a blue K_t.")
+    parser.add_argument("s", type=int)
+    parser.add_argument("t", type=int)
+    parser.add_argument("--max-order", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--circulant", type=int, metavar="N",
+                        help="only search circulant colourings of K_N")
+    parser.add_argument("--no-refine", action="store_true",
+                        help="compute canonical forms without colour refinement")
+    args = parser.parse_args(argv)
+
+    if args.circulant:
+        started = time.perf_counter()
+        found = circulant_colourings(args.circulant, args.s, args.t)
+        seconds = time.perf_counter() - started
+        for distances in found:
+            rows = circulant(args.circulant, distances)
+            print(f"red distances {sorted(distances)}: {bitsets_to_graph6(rows).decode('ascii')}")
+        print(f"{len(found)} circulant colouring(s) of K_{args.circulant} in {seconds:.2f}s"
+              + (f": R({args.s},{args.t}) > {args.circulant}" if found else ""))
+        return 0
+
+    level = None
+    for level in ramsey_levels(args.s, args.t, args.max_order, args.workers,
+                               refine=not args.no_refine):
+        print(level, flush=True)
+    if level.count == 0:
+        print(f"R({args.s},{args.t}) = {level.order}")
+    else:
+        print(f"R({args.s},{args.t}) > {level.order}")
+        for rows in level.graphs[:10]:
+            print(bitsets_to_graph6(rows).decode("ascii"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Colour refinement (1-dimensional Weisfeiler-Leman) on CSR arrays with NumPy.
+
+Colours start as degree ranks. Each round, the vertices of a colour class
+(which all have the same degree) are split by the sorted list of their
+neighbours' colours: np.unique on the class's |class| x degree matrix gives
+the lexicographic rank of each list, and the new colour is the class's
+first free colour plus that rank. Colours therefore never depend on vertex
+numbering, only on the graph, and the rounds stop when no class splits.
+
+The stable colouring is summarised by a certificate: for each colour in
+order, the class size and the sorted neighbour colours shared by its
+members. Two graphs with different certificates are not isomorphic; for a
+colouring where every class is a single vertex the certificate is a
+canonical form of the graph.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# One (class size, sorted neighbour colours) pair per colour, in colour order.
+Certificate = Tuple[Tuple[int, Tuple[int, ...]], ...]
+
+
+def adjacency_to_csr(adjacency: Sequence[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    degrees = np.fromiter((len(neighbours) for neighbours in adjacency),
+                          dtype=np.int64, count=len(adjacency))
+    indptr = np.zeros(len(adjacency) + 1, dtype=np.int64)
+    np.cumsum(degrees, out=indptr[1:])
+    indices = np.fromiter((neighbour for neighbours in adjacency for neighbour in neighbours),
+                          dtype=np.int64, count=int(indptr[-1]))
+    return indptr, indices
+
+
+def _sorted_neighbour_colours(indptr: np.ndarray, indices: np.ndarray,
+                              colours: np.ndarray) -> np.ndarray:
+    """Neighbour colours per edge slot, sorted inside each vertex's CSR row."""
+    owners = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    neighbour_colours = colours[indices]
+    return neighbour_colours[np.lexsort((neighbour_colours, owners))]
+
+
+def refine_colours(indptr: np.ndarray, indices: np.ndarray,
+                   colours: Optional[np.ndarray] = None) -> Tuple[np.ndarray, int]:
+    """Stable colouring of the graph given by (indptr, indices) and the number of rounds.
+
+    `colours`, numbered 0..k-1, is the colouring to start from instead of the
+    degree ranks; its classes must not mix degrees, as is the case for any
+    colouring this function returned, even after splitting a class.
+    """
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+    degrees = np.diff(indptr)
+    if colours is None:
+        _, colours = np.unique(degrees, return_inverse=True)
+    colours = np.asarray(colours).astype(np.int64)
+    colour_count = int(colours.max()) + 1 if len(colours) else 0
+
+    rounds = 0
+    while True:
+        rounds += 1
+        sorted_colours = _sorted_neighbour_colours(indptr, indices, colours)
+        class_sizes = np.bincount(colours, minlength=colour_count)
+        order = np.argsort(colours, kind="stable")
+        class_starts = np.concatenate(([0], np.cumsum(class_sizes)))
+
+        new_colours = np.empty_like(colours)
+        next_colour = 0
+        for colour in range(colour_count):
+            members = order[class_starts[colour]:class_starts[colour + 1]]
+            degree = int(degrees[members[0]])
+            if len(members) == 1 or degree == 0:
+                new_colours[members] = next_colour
+                next_colour += 1
+                continue
+            rows = sorted_colours[indptr[members][:, None] + np.arange(degree)]
+            _, ranks = np.unique(rows, axis=0, return_inverse=True)
+            ranks = ranks.reshape(-1)
+            new_colours[members] = next_colour + ranks
+            next_colour += int(ranks.max()) + 1
+
+        colours = new_colours
+        if next_colour == colour_count:
+            return colours, rounds
+        colour_count = next_colour
+
+
+def certificate(indptr: np.ndarray, indices: np.ndarray, colours: np.ndarray) -> Certificate:
+    """Describes a stable colouring independently of vertex numbering."""
+    indptr = np.asarray(indptr, dtype=np.int64)
+    sorted_colours = _sorted_neighbour_colours(indptr, np.asarray(indices, dtype=np.int64),
+                                               colours)
+    colour_count = int(colours.max()) + 1 if len(colours) else 0
+    class_sizes = np.bincount(colours, minlength=colour_count)
+    # Any member will do: the colouring is stable, so members share their lists.
+    representatives = np.full(colour_count, -1, dtype=np.int64)
+    representatives[colours[::-1]] = np.arange(len(colours))[::-1]
+    return tuple(
+        (int(class_sizes[colour]),
+         tuple(int(c) for c in sorted_colours[indptr[vertex]:indptr[vertex + 1]]))
+        for colour, vertex in enumerate(representatives)
+    )
+
+
+def singleton_ranks(colours: np.ndarray, degrees: Sequence[int]) -> List[Tuple[int, int]]:
+    """(vertex, final_index) for the vertices alone in their colour class.
+
+    They are placed where GraphSignatures' sort would put finalized nodes:
+    blocks of decreasing degree, singletons first in their block, by colour.
+    """
+    colour_count = int(colours.max()) + 1 if len(colours) else 0
+    class_sizes = np.bincount(colours, minlength=colour_count)
+    degrees = np.asarray(degrees, dtype=np.int64)
+    block_start = {}
+    start = 0
+    for degree in sorted(set(degrees.tolist()), reverse=True):
+        block_start[degree] = start
+        start += int(np.count_nonzero(degrees == degree))
+
+    singles = np.flatnonzero(class_sizes[colours] == 1)
+    singles = singles[np.argsort(colours[singles], kind="stable")]
+    placed = {degree: 0 for degree in block_start}
+    seeded = []
+    for vertex in singles.tolist():
+        degree = int(degrees[vertex])
+        seeded.append((vertex, block_start[degree] + placed[degree]))
+        placed[degree] += 1
+    return seeded
@@ -0,0 +1,152 @@
+"""Command line: graph6/sparse6 lines in, `graph<TAB>signature` lines out.
+
+    geng 8 | python -m graph_signature_v2 --workers 8 --digest > sigs.tsv
+    geng 8 | python -m graph_signature_v2 --canonical | cut -f2 | sort -u
+
+Input is read as a stream and cut into batches; at most two batches per
+worker are in flight, so memory does not grow with the input, and output
+keeps the input order.
+"""
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from graph6 import decode_adjacency
+from graph_signature_v2 import SCHEDULERS, TREE_BACKENDS, GraphSignatures
+from tracing import PassEvent
+
+# (line number, graph text, signature or None, error message or None)
+Row = Tuple[int, str, Optional[str], Optional[str]]
+
+
+def signature_of(text: str, digest: bool = False,
+                 observer: Optional[Callable[[PassEvent], None]] = None,
+                 canonical: bool = False, **signature_options: Any) -> str:
+    gs = GraphSignatures.from_adjacency_lists(decode_adjacency(text), **signature_options)
+    gs.compute_all_signatures(observer)
+    if canonical:
+        return gs.canonical_graph6().decode("ascii")
+    return gs.hexdigest() if digest else gs.sig()
+
+
+def trace_to_stderr(line_number: int) -> Callable[[PassEvent], None]:
+    """Observer printing one JSON object per pass, tagged with the input line."""
+    def observer(event: PassEvent) -> None:
+        print(json.dumps({"line": line_number, **event.as_dict()}), file=sys.stderr, flush=True)
+    return observer
+
+
+def process_batch(batch: List[Tuple[int, str]], digest: bool,
+                  signature_options: Dict[str, Any], trace: bool = False,
+                  canonical: bool = False) -> List[Row]:
+    rows: List[Row] = []
+    for line_number, text in batch:
+        observer = trace_to_stderr(line_number) if trace else None
+        try:
+            rows.append((line_number, text,
+                         signature_of(text, digest, observer, canonical, **signature_options),
+                         None))
+        except ValueError as error:
+            rows.append((line_number, text, None, str(error)))
+    return rows
+
+
+def read_batches(lines: Iterable[str], batch_size: int) -> Iterator[List[Tuple[int, str]]]:
+    batch: List[Tuple[int, str]] = []
+    for line_number, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text:
+            continue
+        batch.append((line_number, text))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def signature_rows(lines: Iterable[str], workers: int = 1, batch_size: int = 256,
+                   digest: bool = False, trace: bool = False, canonical: bool = False,
+                   **signature_options: Any) -> Iterator[Row]:
+    """Signatures of the graphs in `lines`, in input order."""
+    batches = read_batches(lines, batch_size)
+    if workers == 1:
+        for batch in batches:
+            yield from process_batch(batch, digest, signature_options, trace, canonical)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight: Deque[Future] = deque()
+        for batch in batches:
+            in_flight.append(pool.submit(process_batch, batch, digest, signature_options, trace,
+                                         canonical))
+            if len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def write_rows(rows: Iterable[Row], out: IO[str], err: IO[str]) -> int:
+    """Writes the rows, reports undecodable lines on `err` and returns how many there were."""
+    failures = 0
+    for line_number, text, signature, error in rows:
+        if error is not None:
+            failures += 1
+            print(f"line {line_number}: {error}", file=err)
+            continue
+        out.write(f"{text}\t{signature}\n")
+    out.flush()
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m graph_signature_v2",
+        description="Compute graph signatures for graph6/sparse6 lines.")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="file with one graph per line (default: stdin)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=256,
+                        help="graphs sent to a worker at a time")
+    parser.add_argument("--digest", action="store_true",
+                        help="print a 128-bit hex digest instead of the full signature")
+    parser.add_argument("--canonical", action="store_true",
+                        help="print the canonical graph6 instead of the signature")
+    parser.add_argument("--tree-backend", choices=TREE_BACKENDS, default="objects")
+    parser.add_argument("--scheduler", choices=SCHEDULERS, default="full")
+    parser.add_argument("--sort-keys", action="store_true",
+                        help="sort signatures with precomputed keys")
+    parser.add_argument("--refine", action="store_true",
+                        help="seed signatures with NumPy colour refinement")
+    parser.add_argument("--share-orbits", action="store_true",
+                        help="expand one tree per automorphism orbit")
+    parser.add_argument("--trace", action="store_true",
+                        help="print one JSON line per pass to stderr")
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    options = dict(tree_backend=args.tree_backend, scheduler=args.scheduler,
+                   sort_keys=args.sort_keys, refine=args.refine,
+                   share_orbits=args.share_orbits)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="ascii")
+    try:
+        rows = signature_rows(source, workers, args.batch_size, args.digest, args.trace,
+                              args.canonical, **options)
+        failures = write_rows(rows, sys.stdout, sys.stderr)
+    except BrokenPipeError:
+        # e.g. piped into `head`: stop quietly.
+        sys.stderr.close()
+        return 0
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
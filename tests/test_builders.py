@@ -0,0 +1,74 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from graph_signature_v2 import GraphSignatures
+
+PATH = [[1], [0, 2], [1]]
+
+
+@pytest.mark.parametrize("adjacency", [
+    [[1, 1], [0, 0]],        # repeated neighbour
+    [[-1], [0]],             # negative index
+    [[3], [0]],              # out of range
+    [[1], []],               # asymmetric
+    [[0, 1], [0]],           # loop
+    [[1.0], [0]],            # not an integer
+])
+def test_adjacency_lists_must_be_simple(adjacency):
+    with pytest.raises(ValueError):
+        GraphSignatures.from_adjacency_lists(adjacency)
+
+
+@pytest.mark.parametrize("edges", [[(0, 1), (0, 1)], [(0, 1), (1, 0)], [(0, -1)], [(0, 3)],
+                                   [(1, 1)]])
+def test_edge_lists_must_be_simple(edges):
+    with pytest.raises(ValueError):
+        GraphSignatures.from_edge_list(3, edges)
+
+
+@pytest.mark.parametrize("indptr, indices", [
+    ([0, 2, 3, 4], [1, 1, 0, 1]),   # duplicate entry
+    ([0, 1, 2, 2], [1, 2, 0]),      # asymmetric
+    ([0, 1, 2, 3], [-1, 0, 0]),     # negative index
+    ([0, 1, 2, 3], [5, 0, 0]),      # out of range
+    ([0, 1, 3], [1, 0]),            # indptr past indices
+])
+def test_csr_must_be_simple(indptr, indices):
+    with pytest.raises(ValueError):
+        GraphSignatures.from_csr(np.array(indptr), np.array(indices))
+
+
+@pytest.mark.parametrize("rows", [[0b10, 0], [0b11, 0b01], [0b1000, 0], [-1, 0]])
+def test_bitsets_must_be_simple(rows):
+    with pytest.raises(ValueError):
+        GraphSignatures.from_bitsets(rows)
+
+
+@pytest.mark.parametrize("matrix", [[[0, 2], [2, 0]], [[0, 0.5], [0.5, 0]], [[0, 1], [0, 0]],
+                                    [[1, 0], [0, 0]]])
+def test_matrices_must_be_simple(matrix):
+    with pytest.raises(ValueError):
+        GraphSignatures.from_adjacency_matrix(matrix)
+
+
+@pytest.mark.parametrize("graph", [nx.DiGraph([(0, 1)]), nx.MultiGraph([(0, 1), (0, 1)]),
+                                   nx.Graph([(0, 0), (0, 1)])])
+def test_networkx_graph_must_be_simple(graph):
+    with pytest.raises(ValueError):
+        GraphSignatures(graph)
+
+
+def test_builders_agree_on_valid_input():
+    expected = GraphSignatures.from_adjacency_lists(PATH)
+    expected.compute_all_signatures()
+    built = [
+        GraphSignatures.from_edge_list(3, [(0, 1), (1, 2)]),
+        GraphSignatures.from_csr(np.array([0, 1, 3, 4]), np.array([1, 0, 2, 1])),
+        GraphSignatures.from_bitsets([0b010, 0b101, 0b010]),
+        GraphSignatures.from_adjacency_matrix(np.array([[0, 1, 0], [1, 0, 1], [0, 1, 0]])),
+        GraphSignatures(nx.path_graph(3)),
+    ]
+    for gs in built:
+        gs.compute_all_signatures()
+        assert gs.sig() == expected.sig()
@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from graph_enumeration import gray_code_graphs
+from graph_signature_v2 import GraphSignatures
+
+
+def relabelled(adjacency, seed):
+    permutation = list(range(len(adjacency)))
+    random.Random(seed).shuffle(permutation)
+    result = [[] for _ in adjacency]
+    for vertex, neighbours in enumerate(adjacency):
+        result[permutation[vertex]] = sorted(permutation[neighbour] for neighbour in neighbours)
+    return result
+
+
+@pytest.mark.parametrize("refine", [False, True])
+@pytest.mark.parametrize("order, classes", [(4, 11), (5, 34)])
+def test_one_canonical_form_per_class(order, classes, refine):
+    forms = {GraphSignatures.from_bitsets(rows, refine=refine).canonical_graph6()
+             for _, rows in gray_code_graphs(order)}
+    assert len(forms) == classes
+
+
+def test_relabelled_petersen_graph_has_one_form():
+    outer = [(v, (v + 1) % 5) for v in range(5)]
+    spokes = [(v, v + 5) for v in range(5)]
+    inner = [(5 + v, 5 + (v + 2) % 5) for v in range(5)]
+    adjacency = [[] for _ in range(10)]
+    for u, v in outer + spokes + inner:
+        adjacency[u].append(v)
+        adjacency[v].append(u)
+    forms = {GraphSignatures.from_adjacency_lists(relabelled(adjacency, seed)).canonical_graph6()
+             for seed in range(4)}
+    assert len(forms) == 1
+
+
+def test_canonical_labeling_keeps_signatures():
+    gs = GraphSignatures.from_graph6("Dxo")
+    gs.compute_all_signatures()
+    before = gs.sig()
+    labeling = gs.canonical_labeling()
+    assert sorted(labeling) == list(range(5))
+    assert gs.sig() == before
@@ -0,0 +1,28 @@
+from catalogue import SignatureCatalogue, append_to_catalogue, classification_entries
+from classification import classify
+from graph_enumeration import gray_code_graphs
+from graph6 import bitsets_to_graph6
+from validation import catalogue_entries
+
+
+def test_one_entry_per_class_from_digest_table(tmp_path):
+    # Dxo and D|O are isomorphic but have different signature digests.
+    table = {b"a" * 16: [3, "Dxo"], b"b" * 16: [2, "D|O"], b"c" * 16: [1, "DQc"]}
+    path = str(tmp_path / "graphs.cat")
+    assert append_to_catalogue(path, catalogue_entries(table)) == 2
+    with SignatureCatalogue(path) as catalogue:
+        canonical, entry = catalogue.lookup("D|O")
+        assert entry[1] == 5 and entry[2] == canonical.decode("ascii")
+        assert catalogue.lookup("DQc")[1][1] == 1
+        assert catalogue.lookup("D??")[1] is None
+
+
+def test_order_5_catalogue_has_34_classes(tmp_path):
+    graphs = [bitsets_to_graph6(rows) for _, rows in gray_code_graphs(5)]
+    path = str(tmp_path / "graphs.cat")
+    half = len(graphs) // 2
+    for part in (graphs[:half], graphs[half:]):
+        append_to_catalogue(path, classification_entries(classify(part, canonical_keys=True)))
+    with SignatureCatalogue(path) as catalogue:
+        assert len(catalogue) == 34
+        assert sum(entry[1] for entry in catalogue) == len(graphs)
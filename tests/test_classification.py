@@ -0,0 +1,18 @@
+import pytest
+
+from classification import classify, classify_graphs
+from graph_enumeration import gray_code_graphs
+from graph6 import bitsets_to_adjacency
+
+
+@pytest.mark.parametrize("refine", [False, True])
+@pytest.mark.parametrize("order, classes", [(4, 11), (5, 34)])
+def test_classes_of_all_labelled_graphs(order, classes, refine):
+    graphs = [bitsets_to_adjacency(rows) for _, rows in gray_code_graphs(order)]
+    assert len(classify_graphs(graphs, refine=refine).classes) == classes
+
+
+def test_canonical_keys_merge_graphs_with_different_signatures():
+    classes = classify(["Dxo", "D|O", "D\\o", "Dlo", "DQc"], canonical_keys=True)
+    assert sorted(map(len, classes.values())) == [1, 2, 2]
+    assert all(isinstance(key, bytes) for key in classes)
@@ -0,0 +1,10 @@
+from benchmarks.equivalence import atlas_graphs, differences, main
+
+
+def test_all_options_agree_up_to_order_4():
+    assert differences(atlas_graphs(4)) == []
+
+
+def test_main_takes_the_order(capsys):
+    assert main(["--max-order", "3"]) == 0
+    assert capsys.readouterr().out.startswith("8 atlas graphs")
@@ -0,0 +1,17 @@
+import pytest
+
+from graph_generation import generate_levels
+from graph_signature_v2 import GraphSignatures
+from validation import A000088
+
+
+@pytest.mark.parametrize("refine", [False, True])
+def test_one_graph_per_class_up_to_order_6(refine):
+    for level in generate_levels(6, workers=1, refine=refine):
+        assert level.count == A000088[level.order]
+
+
+def test_order_6_representatives_are_pairwise_non_isomorphic():
+    *_, level = generate_levels(6, workers=1)
+    forms = {GraphSignatures.from_bitsets(rows).canonical_graph6() for rows in level.graphs}
+    assert len(forms) == A000088[6]
@@ -0,0 +1,22 @@
+import networkx as nx
+import pytest
+
+from isomorphism import are_isomorphic
+
+
+@pytest.mark.parametrize("refine", [False, True])
+@pytest.mark.parametrize("graph_a, graph_b", [("Dxo", "D|O"), ("D\\o", "Dlo")])
+def test_isomorphic_graphs_with_different_signatures(graph_a, graph_b, refine):
+    assert nx.is_isomorphic(nx.from_graph6_bytes(graph_a.encode()),
+                            nx.from_graph6_bytes(graph_b.encode()))
+    assert are_isomorphic(graph_a, graph_b, refine=refine)
+
+
+@pytest.mark.parametrize("refine", [False, True])
+def test_agrees_with_networkx_on_order_5(refine):
+    graphs = [graph for graph in nx.graph_atlas_g()[1:] if graph.number_of_nodes() == 5]
+    relabelled = [nx.relabel_nodes(graph, {v: (2 * v + 1) % 5 for v in graph}) for graph in graphs]
+    for graph_a in graphs[::3]:
+        for graph_b in relabelled:
+            assert bool(are_isomorphic(graph_a, graph_b, refine=refine)) \
+                == nx.is_isomorphic(graph_a, graph_b)
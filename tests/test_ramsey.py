@@ -0,0 +1,19 @@
+from ramsey import circulant_colourings, colouring_key, complement, ramsey_number
+
+
+def test_small_ramsey_numbers():
+    assert ramsey_number(3, 3, workers=1)[0] == 6
+    order, levels = ramsey_number(3, 4, workers=1)
+    assert order == 9
+    assert [level.count for level in levels] == [1, 2, 3, 6, 9, 15, 9, 3, 0]
+
+
+def test_colour_swap_gives_the_same_key():
+    pentagon = [0b10010, 0b00101, 0b01010, 0b10100, 0b01001]
+    options = {"refine": True}
+    assert colouring_key(pentagon, 3, 3, options) == \
+        colouring_key(complement(pentagon), 3, 3, options)
+
+
+def test_paley_colouring_of_k17():
+    assert [sorted(distances) for distances in circulant_colourings(17, 4, 4)] == [[1, 2, 4, 8]]
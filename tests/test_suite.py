@@ -0,0 +1,14 @@
+from benchmarks.suite import CASES, SLOW_CASES, regressions
+
+
+def test_slow_cases_exist():
+    assert SLOW_CASES <= set(CASES)
+
+
+def test_skipped_cases_are_not_regressions():
+    ok = {"name": "order-6", "status": "ok", "seconds": 50.0, "passes": 1,
+          "tree_nodes": 1, "compares": 1}
+    skipped = {"name": "order-6", "status": "skipped"}
+    assert regressions([skipped], {"cases": [ok]}, 0.25) == []
+    assert regressions([ok], {"cases": [skipped]}, 0.25) == []
+    assert regressions([dict(ok, seconds=100.0)], {"cases": [ok]}, 0.25) != []
@@ -0,0 +1,203 @@
+"""Per-pass events for GraphSignatures.compute_all_signatures.
+
+    def show(event):
+        print(event)
+
+    gs.compute_all_signatures(observer=show)
+
+While an observer is attached, PassTracer replaces a few methods of that
+one GraphSignatures instance with timed and counting wrappers, and takes
+them away when the computation ends. Other instances, and runs without an
+observer, execute the plain methods.
+"""
+import time
+from functools import cmp_to_key
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from graph_signature_v2 import GraphSignatures, NodeSignature
+
+
+class PassEvent:
+    """What one pass did.
+
+    `compares` counts comparisons of root signatures, made by the pass's
+    sorts and its uniqueness checks; sorting the children of an expanded
+    node is part of `expand_seconds`. `compare_seconds` is the time spent
+    in those compares, most of it inside `sort_seconds`.
+    """
+
+    def __init__(self, pass_number: int, newly_finalized: int, ambiguous: int,
+                 expanded: int, tree_size: int, compares: int, sort_seconds: float,
+                 compare_seconds: float, expand_seconds: float, seconds: float):
+        self.pass_number: int = pass_number
+        self.newly_finalized: int = newly_finalized
+        self.ambiguous: int = ambiguous
+        # Tree leaves that got children during this pass.
+        self.expanded: int = expanded
+        # Entries in all signature trees at the end of the pass; with the
+        # "shared" backend, entries created so far.
+        self.tree_size: int = tree_size
+        self.compares: int = compares
+        self.sort_seconds: float = sort_seconds
+        self.compare_seconds: float = compare_seconds
+        self.expand_seconds: float = expand_seconds
+        self.seconds: float = seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    def __repr__(self) -> str:
+        return (f"PassEvent(pass {self.pass_number}: +{self.newly_finalized} finalized, "
+                f"{self.ambiguous} ambiguous, {self.expanded} expanded, "
+                f"tree {self.tree_size}, {self.compares} compares, "
+                f"sort {self.sort_seconds:.4f}s, compare {self.compare_seconds:.4f}s, "
+                f"expand {self.expand_seconds:.4f}s, total {self.seconds:.4f}s)")
+
+
+def tree_size(gs: "GraphSignatures") -> int:
+    """Number of entries in all signature trees of `gs`.
+
+    With share_orbits, orbit-mates list the same children: entries are
+    counted once however many roots reach them.
+    """
+    if gs.tree is not None:
+        return len(gs.tree)
+    seen: Set[int] = set()
+    stack = list(gs.all_signatures)
+    while stack:
+        sig = stack.pop()
+        if id(sig) in seen:
+            continue
+        seen.add(id(sig))
+        if sig.neighbours:
+            stack.extend(sig.neighbours)
+    return len(seen)
+
+
+class PassTracer:
+    """Instruments one GraphSignatures instance until remove() is called."""
+
+    def __init__(self, gs: "GraphSignatures", observer: Callable[[PassEvent], None]):
+        self.gs = gs
+        self.observer = observer
+        self.tree_size = tree_size(gs)
+        self.finalized = self._count_finalized()
+        self._reset()
+
+        compare = gs.compare
+        sorted_runs = gs._sorted_runs
+        expand_node = gs.expand_node
+        expand_node_keyed = gs._expand_node_keyed
+
+        def timed_compare(sig_a: "NodeSignature", sig_b: "NodeSignature") -> int:
+            start = time.perf_counter()
+            result = compare(sig_a, sig_b)
+            self.compare_seconds += time.perf_counter() - start
+            self.compares += 1
+            return result
+
+        def timed_sort_all() -> None:
+            start = time.perf_counter()
+            # Same order as the plain sort: list.sort only asks "<".
+            gs.all_signatures.sort(key=cmp_to_key(gs.compare))
+            self.sort_seconds += time.perf_counter() - start
+
+        def timed_sorted_runs() -> List[Tuple[int, int]]:
+            start = time.perf_counter()
+            runs = sorted_runs()
+            self.sort_seconds += time.perf_counter() - start
+            return runs
+
+        def timed_expand_node(sig_obj: "NodeSignature", pass_number: int) -> bool:
+            start = time.perf_counter()
+            result = expand_node(sig_obj, pass_number)
+            self.expand_seconds += time.perf_counter() - start
+            return result
+
+        def timed_expand_node_keyed(sig_obj: "NodeSignature", pass_number: int):
+            start = time.perf_counter()
+            result = expand_node_keyed(sig_obj, pass_number)
+            self.expand_seconds += time.perf_counter() - start
+            return result
+
+        self._installed = {
+            "compare": timed_compare,
+            "_sort_all": timed_sort_all,
+            "_sorted_runs": timed_sorted_runs,
+            "expand_node": timed_expand_node,
+            "_expand_node_keyed": timed_expand_node_keyed,
+        }
+        if gs.tree is not None:
+            tree_expand = gs.tree.expand
+
+            def counted_tree_expand(row: int, ancestors: Optional[Dict[int, int]] = None) -> bool:
+                expanded = tree_expand(row, ancestors)
+                self.expanded += expanded
+                return expanded
+
+            gs.tree.expand = counted_tree_expand
+            if gs.tree_backend == "shared":
+                expand_leaf = gs.tree.expand_leaf
+
+                def counted_expand_leaf(row: int, ancestors: Dict[int, int]) -> int:
+                    self.expanded += 1
+                    return expand_leaf(row, ancestors)
+
+                gs.tree.expand_leaf = counted_expand_leaf
+        else:
+            expand_signature_node = gs._expand_signature_node
+
+            def counted_expand(sig_to_expand: "NodeSignature", pass_number: int,
+                               ancestors: Optional[Dict[Any, int]] = None) -> bool:
+                expanded = expand_signature_node(sig_to_expand, pass_number, ancestors)
+                if expanded:
+                    # New entries: orbit-mates share them, but are never expanded themselves.
+                    self.expanded += 1
+                    self.tree_size += len(sig_to_expand.neighbours)
+                return expanded
+
+            self._installed["_expand_signature_node"] = counted_expand
+        for name, method in self._installed.items():
+            setattr(gs, name, method)
+
+    def _reset(self) -> None:
+        self.started = time.perf_counter()
+        self.expanded = 0
+        self.compares = 0
+        self.sort_seconds = 0.0
+        self.compare_seconds = 0.0
+        self.expand_seconds = 0.0
+
+    def _count_finalized(self) -> int:
+        return sum(1 for node in self.gs.nodes_map.values() if node.final_index is not None)
+
+    def start_pass(self) -> None:
+        self._reset()
+
+    def end_pass(self, pass_number: int) -> None:
+        finalized = self._count_finalized()
+        if self.gs.tree is not None:
+            self.tree_size = len(self.gs.tree)
+        event = PassEvent(
+            pass_number=pass_number,
+            newly_finalized=finalized - self.finalized,
+            ambiguous=len(self.gs.nodes_map) - finalized,
+            expanded=self.expanded,
+            tree_size=self.tree_size,
+            compares=self.compares,
+            sort_seconds=self.sort_seconds,
+            compare_seconds=self.compare_seconds,
+            expand_seconds=self.expand_seconds,
+            seconds=time.perf_counter() - self.started,
+        )
+        self.finalized = finalized
+        self.observer(event)
+
+    def remove(self) -> None:
+        for name in self._installed:
+            delattr(self.gs, name)
+        if self.gs.tree is not None:
+            del self.gs.tree.expand
+            if self.gs.tree_backend == "shared":
+                del self.gs.tree.expand_leaf
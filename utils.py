@@ -3,6 +3,7 @@ import matplotlib.colors as mcolors
 import matplotlib.pyplot as plt
 import networkx as nx
 from graph_signature_v2 import Node, NodeSignature, GraphSignatures
+from graph6 import graph6_to_adjacency
 import networkx as nx
 from typing import List, Optional, Union, Tuple
 import string
@@ -75,20 +76,24 @@ def make_figure(signatures: GraphSignatures, title: str):
 
 def get_signature(graph_input: Union[nx.Graph, str]) -> GraphSignatures:
     if isinstance(graph_input, nx.Graph):
-        graph = graph_input
+        order = graph_input.order()
     elif isinstance(graph_input, str):
-        graph = nx.from_graph6_bytes(graph_input.encode('ascii'))
+        adjacency = graph6_to_adjacency(graph_input)
+        order = len(adjacency)
     else:
         raise TypeError("Input must be a nx.Graph object or a g6 string.")
 
-    if graph.order() > len(string.ascii_uppercase):
-        raise ValueError(
-            "Cannot relabel graph with > 26 nodes to single letters.")
-
-    mapping = {i: string.ascii_uppercase[i] for i in range(graph.order())}
-    graph = nx.relabel_nodes(graph, mapping)
-
-    gs = GraphSignatures(graph)
+    # Up to 26 nodes are relabelled A, B, C... as in the notebooks; larger
+    # graphs keep integer labels 0..n-1.
+    labels = list(string.ascii_uppercase[:order]) if order <= len(string.ascii_uppercase) else None
+    if isinstance(graph_input, nx.Graph):
+        if labels is not None:
+            mapping = {i: labels[i] for i in range(order)}
+            graph_input = nx.relabel_nodes(graph_input, mapping)
+        gs = GraphSignatures(graph_input)
+    else:
+        # g6 strings skip networkx entirely; the signature has no .graph to draw.
+        gs = GraphSignatures.from_adjacency_lists(adjacency, labels=labels)
     gs.compute_all_signatures()
 
     return gs
@@ -0,0 +1,516 @@
+"""Brute-force validation of the signature algorithm, sharded over a process pool.
+
+This is the engine behind chapter 5's `test_order`: every labelled graph of
+order n is visited by the Gray-code walk of graph_enumeration, the walk is
+cut into shards, and each worker returns a local table
+signature digest -> [count, example g6]. The tables are merged and the
+number of distinct signatures is compared with OEIS A000088. With
+`audit_collisions` the full sig() strings are kept as well, to check that no
+two different signatures share a digest. With `audit_isomorphism` each graph
+also gets a certificate, its graph6 after relabelling the vertices in
+signature order: graphs with one digest and one certificate are isomorphic.
+When a certificate differs from its digest's first one, the canonical_graph6
+of both is compared; only the graphs that fail that too are checked with
+networkx, on the process pool, after the enumeration.
+
+With `checkpoint`, every finished shard is merged into an SQLite file in one
+transaction, together with the shard's signatures and collisions. Running
+again with the same file skips the finished shards and ends with the same
+counts, so a crash or an OOM only loses the shards that were running.
+
+Past n=7 the labelled graphs are too many; `--orderly` instead checks the
+one-per-class representatives built by graph_generation.
+
+With `--catalogue`, the classes found are appended to a signature catalogue
+(see catalogue.py), one entry per canonical form: digests that turn out to
+be one class are merged there.
+
+Run from the repository root, e.g. `python -m validation 7 --workers 8`, or
+`python -m validation 8 --checkpoint n8.sqlite` to be able to resume.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from catalogue import CatalogueEntry, append_to_catalogue, class_entry
+from graph6 import bitsets_to_graph6
+from graph_enumeration import edge_count, gray_code_graphs
+from graph_generation import generate_levels
+from graph_signature_v2 import GraphSignatures
+
+# Number of non-isomorphic graphs of order n, n = 0, 1, 2, ...
+A000088 = [
+    1, 1, 2, 4, 11, 34, 156, 1044, 12346, 274668, 12005168, 1018997864,
+    165091172592, 50502031367952,
+]
+
+# digest -> [count, g6 of the first graph seen with it(, its sig() when auditing)]
+SignatureTable = Dict[bytes, List[Any]]
+# (digest in hex, g6 of one graph, g6 of a graph with another sig() and that digest)
+Collision = Tuple[str, str, str]
+# (digest, g6 of a graph whose canonical form differs from the digest's first one)
+Suspect = Tuple[bytes, str]
+
+
+def _add_entry(table: SignatureTable, digest: bytes, entry: List[Any],
+               collisions: List[Collision]) -> None:
+    existing = table.get(digest)
+    if existing is None:
+        table[digest] = entry
+        return
+    existing[0] += entry[0]
+    if len(entry) > 2 and len(existing) > 2 and entry[2] != existing[2]:
+        collisions.append((digest.hex(), existing[1], entry[1]))
+
+
+def relabelling_certificate(gs: GraphSignatures, rows: Sequence[int]) -> bytes:
+    """graph6 of `rows` with the vertices renumbered in signature order.
+
+    Finalized vertices come first, by final_index, then the others by their
+    place in all_signatures. `gs` must be computed from `rows`.
+    """
+    sigs = gs.all_signatures
+    ranked = sorted(range(len(sigs)), key=lambda position: (
+        len(sigs) if sigs[position].final_index is None else sigs[position].final_index,
+        position))
+    label = [0] * len(sigs)
+    for new_label, position in enumerate(ranked):
+        label[sigs[position].node.index] = new_label
+    relabelled = [0] * len(rows)
+    for vertex, row in enumerate(rows):
+        new_row = 0
+        while row:
+            low = row & -row
+            new_row |= 1 << label[low.bit_length() - 1]
+            row ^= low
+        relabelled[label[vertex]] = new_row
+    return bitsets_to_graph6(relabelled)
+
+
+class CertificateAudit:
+    """The certificate of the first graph seen per digest, and the graphs that did not match it.
+
+    A graph whose certificate differs from its digest's first one is only a
+    suspect if the canonical_graph6 of the two certificates differ too.
+    Canonical forms are computed, with `refine`, for those certificates
+    alone and once each: many graphs of a class share a certificate.
+    """
+
+    def __init__(self, refine: bool = False):
+        self.refine: bool = refine
+        self.certificates: Dict[bytes, bytes] = {}
+        self.suspects: List[Suspect] = []
+        # certificate -> its canonical_graph6, for the certificates compared so far.
+        self._canonical_forms: Dict[bytes, bytes] = {}
+
+    def _canonical_form(self, certificate: bytes) -> bytes:
+        form = self._canonical_forms.get(certificate)
+        if form is None:
+            form = self._canonical_forms[certificate] = GraphSignatures.from_graph6(
+                certificate, refine=self.refine).canonical_graph6()
+        return form
+
+    def add(self, digest: bytes, certificate: bytes, example: Callable[[], str]) -> None:
+        """Records one graph; `example` gives its g6, only called for a suspect."""
+        first = self.certificates.setdefault(digest, certificate)
+        if first != certificate and (
+                self._canonical_form(certificate) != self._canonical_form(first)):
+            self.suspects.append((digest, example()))
+
+    def merge(self, other: "CertificateAudit", examples: SignatureTable) -> None:
+        """Adds a shard's audit; `examples` is that shard's table, whose examples
+        are the graphs its certificates belong to."""
+        for digest, certificate in other.certificates.items():
+            self.add(digest, certificate, lambda: examples[digest][1])
+        self.suspects.extend(other.suspects)
+
+
+def validate_shard(order: int, start: int, stop: int,
+                   signature_options: Optional[Dict[str, Any]] = None,
+                   audit_collisions: bool = False, audit_isomorphism: bool = False
+                   ) -> Tuple[SignatureTable, List[Collision], Optional[CertificateAudit]]:
+    """Worker: signature table of graphs start .. stop - 1 of the Gray-code walk."""
+    signature_options = signature_options or {}
+    table: SignatureTable = {}
+    collisions: List[Collision] = []
+    audit = None
+    if audit_isomorphism:
+        audit = CertificateAudit(signature_options.get("refine", False))
+    for _mask, rows in gray_code_graphs(order, start, stop):
+        gs = GraphSignatures.from_bitsets(rows, **signature_options)
+        gs.compute_all_signatures()
+        digest = gs.digest()
+        if audit is not None:
+            audit.add(digest, relabelling_certificate(gs, rows),
+                      lambda: bitsets_to_graph6(rows).decode("ascii"))
+
+        entry = table.get(digest)
+        if entry is not None and not audit_collisions:
+            entry[0] += 1
+            continue
+        example = bitsets_to_graph6(rows).decode("ascii")
+        new_entry = [1, example, gs.sig()] if audit_collisions else [1, example]
+        _add_entry(table, digest, new_entry, collisions)
+    return table, collisions, audit
+
+
+def _is_isomorphic(pair: Tuple[str, str]) -> bool:
+    import networkx as nx
+
+    first, second = (nx.from_graph6_bytes(g6.encode("ascii")) for g6 in pair)
+    return nx.is_isomorphic(first, second)
+
+
+def check_suspects(suspects: List[Suspect], examples: SignatureTable,
+                   workers: int = 1) -> List[Collision]:
+    """The suspects that are not isomorphic to their digest's example, checked with networkx."""
+    pairs = [(examples[digest][1], g6) for digest, g6 in suspects]
+    if workers == 1 or len(pairs) < 2:
+        verdicts = list(map(_is_isomorphic, pairs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            verdicts = list(pool.map(_is_isomorphic, pairs,
+                                     chunksize=max(1, len(pairs) // (4 * workers))))
+    return [(digest.hex(), first, second)
+            for (digest, _), (first, second), isomorphic in zip(suspects, pairs, verdicts)
+            if not isomorphic]
+
+
+def merge_tables(tables: Iterable[SignatureTable],
+                 into: Optional[SignatureTable] = None,
+                 collisions: Optional[List[Collision]] = None) -> SignatureTable:
+    """Reducer: adds counts per digest, keeping the first example seen.
+
+    Entries carrying sig() strings that differ under one digest are appended
+    to `collisions`.
+    """
+    merged: SignatureTable = {} if into is None else into
+    collisions = [] if collisions is None else collisions
+    for table in tables:
+        for digest, entry in table.items():
+            _add_entry(merged, digest, list(entry), collisions)
+    return merged
+
+
+def catalogue_entries(table: SignatureTable,
+                      signature_options: Optional[Dict[str, Any]] = None) -> List[CatalogueEntry]:
+    """The catalogue entries of a merged table, canonical forms computed from the examples."""
+    return [class_entry(entry[0], [entry[1]], signature_options) for entry in table.values()]
+
+
+def shard_ranges(total: int, shards: int) -> List[Tuple[int, int]]:
+    shards = max(1, min(shards, total))
+    bounds = [total * i // shards for i in range(shards + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(shards)]
+
+
+# With a checkpoint, shards are cut to at most this many graphs, so that a
+# shard is minutes of work rather than hours.
+CHECKPOINT_SHARD_GRAPHS = 1 << 16
+
+
+class ValidationCheckpoint:
+    """SQLite file with the progress of one validate_order run.
+
+    It records the run's settings (order, number of shards, signature
+    options, auditing), the shards already merged, the merged signature
+    table and collisions and, when auditing isomorphism, the certificates
+    and suspects. Reopening it with other settings raises ValueError.
+    """
+
+    def __init__(self, path: str, order: int, shards: int,
+                 signature_options: Dict[str, Any], audit_collisions: bool,
+                 audit_isomorphism: bool = False):
+        self.path: str = path
+        self.refine: bool = signature_options.get("refine", False)
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS settings (id INTEGER PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS shards (start INTEGER PRIMARY KEY, stop INTEGER);
+                CREATE TABLE IF NOT EXISTS signatures (
+                    digest BLOB PRIMARY KEY, count INTEGER, example TEXT, sig TEXT);
+                CREATE TABLE IF NOT EXISTS collisions (digest TEXT, first TEXT, second TEXT);
+                CREATE TABLE IF NOT EXISTS certificates (digest BLOB PRIMARY KEY, certificate BLOB);
+                CREATE TABLE IF NOT EXISTS suspects (digest BLOB, example TEXT);
+            """)
+        settings = {"order": order, "shards": shards,
+                    "signature_options": signature_options, "audit_collisions": audit_collisions,
+                    "audit_isomorphism": audit_isomorphism}
+        row = self.connection.execute("SELECT value FROM settings WHERE id = 0").fetchone()
+        if row is None:
+            with self.connection:
+                self.connection.execute("INSERT INTO settings VALUES (0, ?)",
+                                        (json.dumps(settings, sort_keys=True),))
+        else:
+            saved = json.loads(row[0])
+            # The shard layout of the first run is kept, whatever the workers now.
+            settings["shards"] = saved["shards"]
+            if saved != settings:
+                self.connection.close()
+                raise ValueError(f"Checkpoint {path} was written for {saved}, not {settings}.")
+        self.shards: int = settings["shards"]
+
+    def load(self) -> Tuple[SignatureTable, List[Collision], CertificateAudit, Set[Tuple[int, int]]]:
+        """The merged table, collisions and audit, and the (start, stop) of the finished shards."""
+        table: SignatureTable = {}
+        for digest, count, example, sig in self.connection.execute(
+                "SELECT digest, count, example, sig FROM signatures"):
+            table[bytes(digest)] = [count, example] if sig is None else [count, example, sig]
+        collisions: List[Collision] = [
+            tuple(row) for row in self.connection.execute("SELECT * FROM collisions")]
+        audit = CertificateAudit(self.refine)
+        audit.certificates = {
+            bytes(digest): bytes(certificate) for digest, certificate in
+            self.connection.execute("SELECT digest, certificate FROM certificates")}
+        audit.suspects = [(bytes(digest), example) for digest, example in
+                          self.connection.execute("SELECT digest, example FROM suspects")]
+        done = set(self.connection.execute("SELECT start, stop FROM shards"))
+        return table, collisions, audit, done
+
+    def save_shard(self, shard: Tuple[int, int], table: SignatureTable,
+                   collisions: List[Collision], audit: Optional[CertificateAudit] = None,
+                   suspects: Sequence[Suspect] = ()) -> None:
+        """Adds one finished shard's table and audit, and the collisions and suspects it led to."""
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO signatures VALUES (?, ?, ?, ?) ON CONFLICT (digest) "
+                "DO UPDATE SET count = count + excluded.count",
+                ((digest, entry[0], entry[1], entry[2] if len(entry) > 2 else None)
+                 for digest, entry in table.items()))
+            self.connection.executemany("INSERT INTO collisions VALUES (?, ?, ?)", collisions)
+            if audit is not None:
+                self.connection.executemany("INSERT OR IGNORE INTO certificates VALUES (?, ?)",
+                                            audit.certificates.items())
+            self.connection.executemany("INSERT INTO suspects VALUES (?, ?)", suspects)
+            self.connection.execute("INSERT INTO shards VALUES (?, ?)", shard)
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class ValidationResult:
+    """Outcome of a brute-force run for one order."""
+
+    def __init__(self, order: int, expected: Optional[int], graphs: int,
+                 signature_groups: SignatureTable, seconds: float,
+                 collisions: Optional[List[Collision]] = None,
+                 audit: Optional[CertificateAudit] = None,
+                 non_isomorphic: Optional[List[Collision]] = None):
+        self.order: int = order
+        self.expected: Optional[int] = expected
+        self.graphs: int = graphs
+        self.signature_groups: SignatureTable = signature_groups
+        self.seconds: float = seconds
+        self.collisions: List[Collision] = collisions or []
+        # Only with audit_isomorphism: the certificates and suspects, and the
+        # suspects networkx found not isomorphic to their digest's example.
+        self.audit: Optional[CertificateAudit] = audit
+        self.non_isomorphic: List[Collision] = non_isomorphic or []
+
+    @property
+    def unique_signatures(self) -> int:
+        return len(self.signature_groups)
+
+    @property
+    def passed(self) -> bool:
+        return (self.unique_signatures == self.expected and not self.collisions
+                and not self.non_isomorphic)
+
+    def __str__(self) -> str:
+        mark = "✅" if self.passed else "❌"
+        text = (f"{mark} For n={self.order}, we expect {self.expected} unique signatures "
+                f"and got {self.unique_signatures} ({self.graphs} graphs in {self.seconds:.1f}s)")
+        if self.collisions:
+            text += f", {len(self.collisions)} digest collision(s)"
+        if self.audit is not None:
+            text += (f", {len(self.audit.suspects)} uncertified, "
+                     f"{len(self.non_isomorphic)} non-isomorphic graph(s) sharing a signature")
+        return text
+
+
+def validate_order(order: int, num_expected: Optional[int] = None,
+                   workers: Optional[int] = None, shards: Optional[int] = None,
+                   progress: bool = True, audit_collisions: bool = False,
+                   audit_isomorphism: bool = False, checkpoint: Optional[str] = None,
+                   **signature_options: Any) -> ValidationResult:
+    """Computes the signature of every labelled graph of `order` and counts the distinct ones.
+
+    `workers` defaults to os.cpu_count(); with one worker everything runs in
+    this process. `shards` defaults to 16 per worker so that slow shards do
+    not leave cores idle at the end, and to at least one per
+    CHECKPOINT_SHARD_GRAPHS graphs with a checkpoint. `audit_collisions`
+    keeps one full sig() per digest to detect digest collisions.
+    `audit_isomorphism` checks that graphs sharing a digest are isomorphic,
+    by certificate, then canonical form and, for the graphs that fail both,
+    with networkx.
+    `checkpoint` is the path of a ValidationCheckpoint to resume from and
+    write to; a resumed run keeps the shards of the first one, and its
+    `seconds` only count this run. `signature_options` are passed on to
+    GraphSignatures. The expected count defaults to A000088[order].
+    """
+    if num_expected is None and order < len(A000088):
+        num_expected = A000088[order]
+    workers = workers or os.cpu_count() or 1
+    total = 2 ** edge_count(order)
+    shards = shards or workers * 16
+    signature_groups: SignatureTable = {}
+    collisions: List[Collision] = []
+    audit = CertificateAudit(signature_options.get("refine", False))
+    finished: Set[Tuple[int, int]] = set()
+    saved: Optional[ValidationCheckpoint] = None
+    if checkpoint is not None:
+        shards = max(shards, -(-total // CHECKPOINT_SHARD_GRAPHS))
+        saved = ValidationCheckpoint(checkpoint, order, shards, signature_options,
+                                     audit_collisions, audit_isomorphism)
+        shards = saved.shards
+        signature_groups, collisions, audit, finished = saved.load()
+    ranges = [shard for shard in shard_ranges(total, shards) if shard not in finished]
+
+    if progress:
+        print(f"--- Testing Order n={order} ---")
+        if finished:
+            print(f"Resuming from {checkpoint}: {len(finished)} shards already done.")
+        print(f"Processing {total} graphs in {len(ranges)} shards on {workers} worker(s)...")
+
+    started = time.perf_counter()
+    done = sum(stop - start for start, stop in finished)
+    resumed = done
+
+    def merge(shard: Tuple[int, int], table: SignatureTable,
+              shard_collisions: List[Collision], shard_audit: Optional[CertificateAudit]) -> None:
+        nonlocal done
+        known = len(collisions)
+        collisions.extend(shard_collisions)
+        merge_tables([table], signature_groups, collisions)
+        known_suspects = len(audit.suspects)
+        if shard_audit is not None:
+            audit.merge(shard_audit, table)
+        if saved is not None:
+            saved.save_shard(shard, table, collisions[known:], shard_audit,
+                             audit.suspects[known_suspects:])
+        done += shard[1] - shard[0]
+        if progress:
+            rate = (done - resumed) / max(time.perf_counter() - started, 1e-9)
+            print(f"[{done * 100 // total}%] {done}/{total} graphs, "
+                  f"{len(signature_groups)} unique signatures ({rate:.0f} graphs/s)")
+
+    try:
+        if workers == 1:
+            for start, stop in ranges:
+                merge((start, stop), *validate_shard(
+                    order, start, stop, signature_options, audit_collisions, audit_isomorphism))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(validate_shard, order, start, stop, signature_options,
+                                audit_collisions, audit_isomorphism): (start, stop)
+                    for start, stop in ranges
+                }
+                for future in as_completed(futures):
+                    merge(futures[future], *future.result())
+    finally:
+        if saved is not None:
+            saved.close()
+
+    non_isomorphic: List[Collision] = []
+    if audit_isomorphism:
+        if progress and audit.suspects:
+            print(f"Checking {len(audit.suspects)} uncertified graph(s) with networkx...")
+        non_isomorphic = check_suspects(audit.suspects, signature_groups, workers)
+    result = ValidationResult(order, num_expected, total, signature_groups,
+                              time.perf_counter() - started, collisions,
+                              audit if audit_isomorphism else None, non_isomorphic)
+    if progress:
+        print(result)
+    return result
+
+
+def validate_orderly(order: int, workers: Optional[int] = None, progress: bool = True,
+                     **signature_options: Any) -> List[ValidationResult]:
+    """Checks orders 1 .. `order` on the canonical-augmentation representatives only.
+
+    The representatives are one per class by canonical augmentation, so each level
+    must have A000088[n] of them; any other count is a bug of the generator
+    or of canonical_labeling, and raises RuntimeError. Their distinct
+    signature digests are then compared with A000088 as in validate_order:
+    fewer means non-isomorphic graphs share a signature.
+    """
+    if progress:
+        print(f"--- Orderly generation up to n={order} ---")
+    results = []
+    for level in generate_levels(order, workers, signatures=True, **signature_options):
+        if level.order < len(A000088) and level.count != A000088[level.order]:
+            raise RuntimeError(
+                f"Orderly generation gave {level.count} graphs of order {level.order}, "
+                f"expected {A000088[level.order]} (A000088).")
+        signature_groups: SignatureTable = {}
+        for digest, rows in zip(level.digests, level.graphs):
+            merge_tables([{digest: [1, bitsets_to_graph6(rows).decode("ascii")]}],
+                         into=signature_groups)
+        expected = A000088[level.order] if level.order < len(A000088) else None
+        result = ValidationResult(level.order, expected, level.count, signature_groups,
+                                  level.seconds)
+        if progress:
+            print(result)
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Check that signatures separate all graphs of an order (OEIS A000088).")
+    parser.add_argument("order", type=int)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="number of shards of the Gray-code walk (default: 16 per worker)")
+    parser.add_argument("--expected", type=int, default=None,
+                        help="expected number of classes (default: A000088)")
+    parser.add_argument("--audit-collisions", action="store_true",
+                        help="keep full signatures to detect digest collisions")
+    parser.add_argument("--audit-isomorphism", action="store_true",
+                        help="check that graphs sharing a signature are isomorphic")
+    parser.add_argument("--refine", action="store_true",
+                        help="seed signatures with NumPy colour refinement")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="SQLite file to save progress to and resume from")
+    parser.add_argument("--catalogue", metavar="PATH",
+                        help="signature catalogue to append the classes found to")
+    parser.add_argument("--orderly", action="store_true",
+                        help="check the canonical-augmentation representatives of orders 1..n "
+                             "instead of every labelled graph")
+    parser.add_argument("--quiet", action="store_true", help="only print the result")
+    args = parser.parse_args(argv)
+
+    if args.orderly:
+        results = validate_orderly(args.order, workers=args.workers, progress=not args.quiet,
+                                   refine=args.refine)
+        if args.catalogue:
+            for result in results:
+                append_to_catalogue(args.catalogue, catalogue_entries(
+                    result.signature_groups, {"refine": args.refine}), {"refine": args.refine})
+        if args.quiet:
+            print(results[-1])
+        return 0 if all(result.passed for result in results) else 1
+
+    result = validate_order(args.order, args.expected, workers=args.workers,
+                            shards=args.shards, progress=not args.quiet,
+                            audit_collisions=args.audit_collisions,
+                            audit_isomorphism=args.audit_isomorphism, checkpoint=args.checkpoint,
+                            refine=args.refine)
+    if args.catalogue:
+        append_to_catalogue(args.catalogue, catalogue_entries(
+            result.signature_groups, {"refine": args.refine}), {"refine": args.refine})
+    if args.quiet:
+        print(result)
+    return 0 if result.passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())